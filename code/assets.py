@@ -0,0 +1,104 @@
+import pygame, os
+from concurrent.futures import ThreadPoolExecutor
+from settings import *
+from bundle import Bundle
+
+# repository root, so assets load the same from any working directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class AssetManager:
+    def __init__(self):
+        # every file is loaded once and shared after that
+        self.images = {}
+        self.sounds = {}
+        self.fonts = {}
+
+        self.image_loads = 0
+        self.sound_loads = 0
+        self.font_loads = 0
+        self.hits = 0
+
+        # files being decoded on worker threads, keyed by name
+        self.pending = {}
+        self.executor = None
+        self.prefetched = 0
+
+        # pre-decoded graphics from bundle.py, files not in it or changed since it was built load from the directory
+        self.bundle = Bundle.open(self.path(ASSET_BUNDLE), BASE_DIR) if ASSET_BUNDLE else None
+        self.bundled = 0
+
+    @staticmethod
+    def path(*parts):
+        return os.path.join(BASE_DIR, *parts)
+
+    # display converted image, with per pixel alpha unless alpha is False
+    def image(self, name, alpha=True):
+        key = (name, alpha)
+        if key in self.images:
+            self.hits += 1
+            return self.images[key]
+
+        if self.bundle and name in self.bundle:
+            surf = self.bundle.image(name)
+            self.bundled += 1
+        else:
+            surf = self.decode(name, pygame.image.load)
+        surf = surf.convert_alpha() if alpha else surf.convert()
+        self.image_loads += 1
+        self.images[key] = surf
+        return surf
+
+    def sound(self, name):
+        if name in self.sounds:
+            self.hits += 1
+            return self.sounds[name]
+
+        sound = self.decode(name, pygame.mixer.Sound)
+        self.sound_loads += 1
+        self.sounds[name] = sound
+        return sound
+
+    # start decoding files in the background, image() and sound() pick up the results
+    def prefetch(self, names):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(ASSET_WORKERS)
+
+        for name in names:
+            loaded = name in self.sounds or (name, True) in self.images or (name, False) in self.images
+            if loaded or name in self.pending or (self.bundle and name in self.bundle):
+                continue
+            loader = pygame.mixer.Sound if name.endswith(('.wav', '.ogg')) else pygame.image.load
+            self.pending[name] = self.executor.submit(loader, self.path(name))
+
+    # converting to the display format has to stay on the main thread, decoding does not
+    def decode(self, name, loader):
+        future = self.pending.pop(name, None)
+        if future:
+            self.prefetched += 1
+            return future.result()
+        return loader(self.path(name))
+
+    def font(self, name, size):
+        key = (name, size)
+        if key in self.fonts:
+            self.hits += 1
+            return self.fonts[key]
+
+        font = pygame.font.Font(self.path(name), size)
+        self.font_loads += 1
+        self.fonts[key] = font
+        return font
+
+    def cache_info(self):
+        return {
+            'images': self.image_loads,
+            'sounds': self.sound_loads,
+            'fonts': self.font_loads,
+            'hits': self.hits,
+            'prefetched': self.prefetched,
+            'bundled': self.bundled,
+        }
+
+
+assets = AssetManager()
@@ -0,0 +1,92 @@
+import pygame
+from settings import *
+from assets import assets
+
+
+# plays sound effects on a fixed set of channels, grouped into buses
+class VoiceManager:
+    def __init__(self, effects=SOUND_EFFECTS, buses=SOUND_BUSES, frame_cap=SOUND_FRAME_CAP):
+        self.frame_cap = frame_cap
+
+        # every bus reserves its own channels so a busy bus can't starve another
+        total = sum(buses.values())
+        if pygame.mixer.get_num_channels() < total:
+            pygame.mixer.set_num_channels(total)
+        pygame.mixer.set_reserved(total)
+
+        self.buses = {}
+        self.volumes = {}
+        index = 0
+        for bus, count in buses.items():
+            self.buses[bus] = [pygame.mixer.Channel(index + i) for i in range(count)]
+            self.volumes[bus] = 0.1
+            index += count
+
+        # name -> (sound, bus, priority), the sound volume is relative to its bus
+        self.effects = {}
+        for name, (file, bus, volume, priority) in effects.items():
+            sound = assets.sound(file)
+            sound.set_volume(volume)
+            self.effects[name] = (sound, bus, priority)
+
+        # what each channel is playing: (priority, start serial)
+        self.voices = {}
+        self.serial = 0
+        self.frame_counts = {}
+
+        self.played = 0
+        self.deduped = 0
+        self.stolen = 0
+        self.dropped = 0
+
+    def play(self, name):
+        # identical effects started in the same frame only add volume, not sound
+        count = self.frame_counts.get(name, 0)
+        if count >= self.frame_cap:
+            self.deduped += 1
+            return
+        self.frame_counts[name] = count + 1
+
+        sound, bus, priority = self.effects[name]
+        channel = self.free_channel(bus, priority)
+        if channel is None:
+            self.dropped += 1
+            return
+
+        channel.play(sound)
+        channel.set_volume(self.volumes[bus])
+        self.serial += 1
+        self.voices[channel] = (priority, self.serial)
+        self.played += 1
+
+    def free_channel(self, bus, priority):
+        channels = self.buses[bus]
+        for channel in channels:
+            if not channel.get_busy():
+                return channel
+
+        # all busy: take over the oldest of the least important voices
+        victim = min(channels, key=lambda channel: self.voices.get(channel, (0, 0)))
+        if self.voices.get(victim, (0, 0))[0] <= priority:
+            self.stolen += 1
+            return victim
+        return None
+
+    # called once per rendered frame
+    def end_frame(self):
+        self.frame_counts.clear()
+
+    # volume for one bus, or for all of them
+    def set_volume(self, volume, bus=None):
+        for name in ([bus] if bus else self.buses):
+            self.volumes[name] = volume
+            for channel in self.buses[name]:
+                channel.set_volume(volume)
+
+    def cache_info(self):
+        return {
+            'played': self.played,
+            'deduped': self.deduped,
+            'stolen': self.stolen,
+            'dropped': self.dropped,
+        }
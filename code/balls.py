@@ -0,0 +1,257 @@
+import math
+import numpy as np
+from settings import *
+from random import choice
+from assets import assets
+from simulation import sweep
+
+# left, right and top wall
+WALL_NORMALS = np.array([[1, 0], [-1, 0], [0, 1]])
+
+
+# every ball in play, one array per property so all of them move and collide in one pass
+class Balls:
+    def __init__(self, player, blocks, sounds):
+
+        # Collision objects
+        self.player = player
+        self.blocks = blocks
+        self.sounds = sounds
+
+        # Graphics setup, one image shared by every ball
+        self.image = assets.image('graphics/other/ball.png')
+        self.width, self.height = self.image.get_size()
+
+        # float position, drawn rect position and the rect position before the last step
+        self.pos = np.zeros((1, 2))
+        self.rect_pos = np.zeros((1, 2), np.int64)
+        self.direction = np.array([[choice((1, -1)), -1]], float)
+        self.follow_paddle()
+        self.old_pos = self.rect_pos.copy()
+
+        # copy of the block grid the collisions run against
+        self.blocks_version = None
+
+        # Initial speed
+        self.base_speed = 300  # This will be the base speed, which will scale with level
+        self.speed = self.base_speed
+
+        # until launched there is one ball, sitting on the paddle
+        self.active = False
+
+    def __len__(self):
+        return len(self.pos)
+
+    def scale_speed_based_on_level(self, level):
+        self.speed = self.base_speed + (level - 1) * 30
+
+    def follow_paddle(self):
+        rect = self.image.get_rect(midbottom=self.player.rect.midtop)
+        self.rect_pos[:] = rect.topleft
+        self.pos[:] = rect.topleft
+
+    # multi-ball upgrade: every ball gets two companions turned to either side
+    def split(self):
+        self.active = True
+        room = MAX_BALLS - len(self)
+        if room <= 0:
+            return
+
+        angle = math.radians(MULTI_BALL_ANGLE)
+        turned = []
+        for side in (angle, -angle):
+            cos, sin = math.cos(side), math.sin(side)
+            x, y = self.direction[:, 0], self.direction[:, 1]
+            turned.append(np.stack([x * cos - y * sin, x * sin + y * cos], axis=1))
+        direction = np.concatenate(turned)[:room]
+        copies = np.tile(np.arange(len(self)), 2)[:room]
+
+        self.pos = np.concatenate([self.pos, self.pos[copies]])
+        self.rect_pos = np.concatenate([self.rect_pos, self.rect_pos[copies]])
+        self.old_pos = np.concatenate([self.old_pos, self.rect_pos[copies]])
+        self.direction = np.concatenate([self.direction, direction])
+
+    def update(self, dt):
+        self.old_pos = self.rect_pos.copy()
+        if not self.active:
+            self.follow_paddle()
+            return
+
+        norm = np.hypot(self.direction[:, 0], self.direction[:, 1])
+        moving = norm != 0
+        self.direction[moving] /= norm[moving, None]
+
+        # swept movement + collision
+        self.move(self.speed * dt)
+        self.rect_pos = np.rint(self.pos).astype(np.int64)
+        self.window_collision()
+
+    def block_snapshot(self):
+        # the live blocks as arrays and a cell -> block table matching the block grid,
+        # built again only after blocks were added or destroyed
+        if self.blocks.version == self.blocks_version:
+            return
+        self.blocks_version = self.blocks.version
+        self.block_list = list(self.blocks)
+        self.block_rects = np.array([tuple(block.rect) for block in self.block_list], np.int64).reshape(-1, 4)
+        self.block_alive = np.ones(len(self.block_list), bool)
+
+        cells = self.blocks.cells
+        rows = max((row for row, col in cells), default=-1) + 1
+        cols = max((col for row, col in cells), default=-1) + 1
+        depth = max((len(blocks) for blocks in cells.values()), default=0)
+        index = {block: number for number, block in enumerate(self.block_list)}
+        self.cell_table = np.full((rows, cols, depth), -1, np.int64)
+        for (row, col), blocks in cells.items():
+            if row >= 0 and col >= 0:
+                for layer, block in enumerate(blocks):
+                    self.cell_table[row, col, layer] = index[block]
+
+    def move(self, distance):
+        # travel the whole distance, bouncing off the first thing in the way each time
+        self.block_snapshot()
+        elapsed = np.zeros(len(self))
+        moving = np.ones(len(self), bool)
+        paddle_move = self.player.rect.x - self.player.old_rect.x
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for _ in range(MAX_BOUNCES):
+                move = self.direction * (distance * (1 - elapsed))[:, None]
+                paddle_x = self.player.old_rect.x + paddle_move * elapsed
+                ball, time, normal, solid, block = self.contacts(moving, move, paddle_x, paddle_move * (1 - elapsed))
+
+                # balls with nothing in the way travel the rest freely, the others up to their first contact
+                earliest = np.full(len(self), np.inf)
+                np.minimum.at(earliest, ball, time)
+                free = moving & np.isinf(earliest)
+                self.pos[free] += move[free]
+                moving &= ~free
+                if not moving.any():
+                    break
+                self.pos[moving] += move[moving] * earliest[moving, None]
+                elapsed[moving] += (1 - elapsed[moving]) * earliest[moving]
+
+                # everything touched at that moment turns the ball
+                hit = time <= earliest[ball] + SWEEP_EPSILON
+                ball, normal, solid, block = ball[hit], normal[hit], solid[hit], block[hit]
+                for axis in (0, 1):
+                    turn = normal[:, axis] != 0
+                    self.direction[ball[turn], axis] = np.abs(self.direction[ball[turn], axis]) * normal[turn, axis]
+                    # keep the same 1px gap the old overlap rules left
+                    push = turn & solid
+                    np.add.at(self.pos[:, axis], ball[push], normal[push, axis])
+                if solid.any():
+                    self.sounds.play('impact')
+
+                # a block hit by several balls at once takes all the hits in one go
+                counts = np.bincount(block[block >= 0], minlength=len(self.block_list))
+                for number in np.flatnonzero(counts):
+                    sprite = self.block_list[number]
+                    sprite.get_damage(int(counts[number]))
+                    self.block_alive[number] = sprite.health > 0
+
+    def contacts(self, moving, move, paddle_x, paddle_move):
+        # everything the balls could touch along move: walls, paddle and blocks,
+        # as one row per ball and contact of time, normal, solid and block (-1 for walls and paddle)
+        found = []
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        walls = np.stack([np.where(move[:, 0] < 0, -x / move[:, 0], np.inf),
+                          np.where(move[:, 0] > 0, (WINDOW_WIDTH - self.width - x) / move[:, 0], np.inf),
+                          np.where(move[:, 1] < 0, -y / move[:, 1], np.inf)], axis=1)
+        ball, wall = np.nonzero(moving[:, None] & (walls >= 0) & (walls <= 1))
+        found.append((ball, walls[ball, wall], WALL_NORMALS[wall], np.zeros(len(ball), bool), np.full(len(ball), -1)))
+
+        # the paddle moves as well, so sweep relative to it, only for balls that get to its height
+        paddle = self.player.rect
+        ball = np.flatnonzero(moving & (y + self.height + np.maximum(move[:, 1], 0) >= paddle.top) &
+                              (y + np.minimum(move[:, 1], 0) <= paddle.bottom))
+        if len(ball):
+            relative = move[ball]
+            relative[:, 0] -= paddle_move[ball]
+            time, normal = sweep(self.pos[ball], relative, self.width, self.height,
+                                 (paddle_x[ball], paddle.top, paddle_x[ball] + paddle.width, paddle.bottom))
+            found.append((ball, time, normal, np.ones(len(ball), bool), np.full(len(ball), -1)))
+
+        ball, block = self.block_pairs(moving, move)
+        if len(ball):
+            rects = self.block_rects[block]
+            time, normal = sweep(self.pos[ball], move[ball], self.width, self.height,
+                                 (rects[:, 0], rects[:, 1], rects[:, 0] + rects[:, 2], rects[:, 1] + rects[:, 3]))
+            found.append((ball, time, normal, np.ones(len(ball), bool), block))
+
+        ball, time, normal, solid, block = (np.concatenate(part) for part in zip(*found))
+        keep = np.isfinite(time)
+        return ball[keep], time[keep], normal[keep], solid[keep], block[keep]
+
+    def block_pairs(self, moving, move):
+        # every live block in the grid cells each ball covers along move, once per ball
+        # most of the time the balls are well below the lowest block
+        rows, cols, depth = self.cell_table.shape
+        bottom = self.blocks.top + rows * self.blocks.cell_height
+        ball = np.flatnonzero(moving & (self.pos[:, 1] + np.minimum(move[:, 1], 0) - 1 < bottom))
+        if not depth or not len(ball):
+            return ball, ball
+
+        # area covered by each ball along move, rounded outwards, as BlockGrid.cell_range sees it
+        x, y = self.pos[ball, 0], self.pos[ball, 1]
+        end_x, end_y = x + move[ball, 0], y + move[ball, 1]
+        left = np.floor(np.minimum(x, end_x)) - 1
+        top = np.floor(np.minimum(y, end_y)) - 1
+        right = np.ceil(np.maximum(x, end_x) + self.width) + 1
+        bottom = np.ceil(np.maximum(y, end_y) + self.height) + 1
+        first_col = (left // self.blocks.cell_width).astype(np.int64)
+        last_col = ((right - 1) // self.blocks.cell_width).astype(np.int64)
+        first_row = ((top - self.blocks.top) // self.blocks.cell_height).astype(np.int64)
+        last_row = ((bottom - 1 - self.blocks.top) // self.blocks.cell_height).astype(np.int64)
+
+        # the cells of all spans in one go, past the end of a shorter span they are masked off
+        row = first_row[:, None, None] + np.arange((last_row - first_row).max() + 1)[None, :, None]
+        col = first_col[:, None, None] + np.arange((last_col - first_col).max() + 1)[None, None, :]
+        inside = (row <= last_row[:, None, None]) & (col <= last_col[:, None, None]) & \
+            (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+        block = self.cell_table[np.where(inside, row, 0), np.where(inside, col, 0)]
+        found = inside[..., None] & (block >= 0)
+        found[found] = self.block_alive[block[found]]
+        ball = np.broadcast_to(ball[:, None, None, None], block.shape)[found]
+
+        key = np.unique(ball * len(self.block_list) + block[found])
+        return key // len(self.block_list), key % len(self.block_list)
+
+    def window_collision(self):
+        left = self.rect_pos[:, 0] < 0
+        self.rect_pos[left, 0] = 0
+        self.pos[left, 0] = 0
+        self.direction[left, 0] *= -1
+
+        right = self.rect_pos[:, 0] + self.width > WINDOW_WIDTH
+        self.rect_pos[right, 0] = WINDOW_WIDTH - self.width
+        self.pos[right, 0] = self.rect_pos[right, 0]
+        self.direction[right, 0] *= -1
+
+        top = self.rect_pos[:, 1] < 0
+        self.rect_pos[top, 1] = 0
+        self.pos[top, 1] = 0
+        self.direction[top, 1] *= -1
+
+        lost = self.rect_pos[:, 1] + self.height > WINDOW_HEIGHT
+        if not lost.any():
+            return
+        if lost.all():
+            # the last ball out costs a heart and goes back onto the paddle
+            self.keep(np.flatnonzero(lost)[:1])
+            self.active = False
+            self.direction[:, 1] = -1
+            self.player.hearts -= 1
+            self.sounds.play('fail')
+        else:
+            self.keep(np.flatnonzero(~lost))
+
+    def keep(self, index):
+        self.pos = self.pos[index]
+        self.rect_pos = self.rect_pos[index]
+        self.old_pos = self.old_pos[index]
+        self.direction = self.direction[index]
+
+    # drawn positions between the last two steps
+    def positions(self, alpha):
+        offset = np.rint((self.old_pos - self.rect_pos) * (1 - alpha)).astype(np.int64)
+        return (self.rect_pos + offset).tolist()
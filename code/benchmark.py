@@ -0,0 +1,428 @@
+import os
+
+# run without a window or sound card
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame, argparse, json, random, statistics, sys, time, tracemalloc
+from contextlib import contextmanager
+from settings import *
+from main import Game
+import main, sprites, blockgrid, balls, levels
+from simulation import BatchSimulation, BALL_SIZE
+
+# maps for the synthetic scenes, same window, different block counts and sizes
+SPARSE_MAP = [
+    '6    5    6 ',
+    '            ',
+    '  3     3   ',
+    '            ',
+    '1    2    1 ',
+    '            ',
+    '            ',
+    '            ',
+    '            ']
+# smallest blocks the nine slice graphics still fit in
+ENLARGED_MAP = [''.join(str(1 + (row + col) % 6) for col in range(18)) for row in range(8)] + [' ' * 18] * 6
+
+
+# keep the paddle under the ball so a scene plays the same way every run
+def autopilot(game):
+    game.player.pos.x = game.balls.rect_pos[0, 0] + game.balls.width / 2 - game.player.rect.width / 2 + 5
+
+
+def play_frames(game, frames):
+    timings = []
+    for frame in range(frames):
+        autopilot(game)
+        start = time.perf_counter()
+        game.play(1 / 60)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+# full redraw against dirty rectangle rendering on the same seeded game
+def render_modes(frames=600, seed=1):
+    results = {}
+    for mode, dirty in (('full', False), ('dirty', True)):
+        game = Game(seed=seed, scores=':memory:')
+        game.started = True
+        game.balls.active = True
+        game.dirty_rendering = dirty
+        timings = play_frames(game, frames)
+        results[mode] = {
+            'mean_ms': statistics.mean(timings) * 1000,
+            'p50_ms': statistics.median(timings) * 1000,
+        }
+    return results
+
+
+# whole gameplay frames with the frame drawn at full, half and quarter resolution, shown in the same window
+def render_scales(frames=600, seed=1):
+    results = {}
+    for scale in (1, 0.5, 0.25):
+        game = Game(seed=seed, render_scale=scale, window_size=(WINDOW_WIDTH, WINDOW_HEIGHT), scores=':memory:')
+        game.started = True
+        game.balls.active = True
+        timings = play_frames(game, frames)
+        results[f'x{scale}'] = {
+            'mean_ms': statistics.mean(timings) * 1000,
+            'p50_ms': statistics.median(timings) * 1000,
+        }
+    return results
+
+
+# cost of one full window CRT draw at each quality
+def crt_tiers(frames=200):
+    game = Game(scores=':memory:')
+    results = {}
+    for quality in ('off', 'static', 'flicker'):
+        game.crt.set_quality(quality)
+        timings = []
+        for frame in range(frames):
+            start = time.perf_counter()
+            game.crt.draw()
+            timings.append(time.perf_counter() - start)
+        results[quality] = {
+            'mean_ms': statistics.mean(timings) * 1000,
+            'p50_ms': statistics.median(timings) * 1000,
+        }
+    return results
+
+
+# time spent in each startup stage up to the first drawn frame
+def startup():
+    game = Game(scores=':memory:')
+    game.draw_play()
+    game.startup.frame_shown()
+    return game.startup.report()
+
+
+# times the phases of a frame by wrapping the methods that run them
+class PhaseTimer:
+    def __init__(self):
+        self.frames = []
+        self.current = {}
+        self.open = []
+        self.wrapped = []
+
+    # a phase called inside another one only counts once, for itself
+    def wrap(self, owner, name, phase):
+        original = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            self.open.append(0)
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                inner = self.open.pop()
+                self.current[phase] = self.current.get(phase, 0) + elapsed - inner
+                if self.open:
+                    self.open[-1] += elapsed
+
+        setattr(owner, name, timed)
+        self.wrapped.append((owner, name, original))
+
+    def end_frame(self, total):
+        self.current['frame'] = total
+        self.frames.append(self.current)
+        self.current = {}
+
+    def restore(self):
+        for owner, name, original in reversed(self.wrapped):
+            setattr(owner, name, original)
+        self.wrapped = []
+
+    # p50 and p99 per phase, frames that skipped a phase count as zero for it
+    def summary(self):
+        phases = {phase for frame in self.frames for phase in frame}
+        summary = {}
+        for phase in sorted(phases):
+            timings = sorted(frame.get(phase, 0) * 1000 for frame in self.frames)
+            summary[phase] = {
+                'p50_ms': percentile(timings, 50),
+                'p99_ms': percentile(timings, 99),
+            }
+        return summary
+
+
+def percentile(ordered, percent):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+# swap the block map and the block size every module computed from it
+@contextmanager
+def block_map(rows):
+    values = {
+        'BLOCK_MAP': rows,
+        'BLOCK_WIDTH': WINDOW_WIDTH / len(rows[0]) - GAP_SIZE,
+        'BLOCK_HEIGHT': WINDOW_HEIGHT / len(rows) - GAP_SIZE,
+    }
+    saved = [(module, {name: getattr(module, name) for name in values}) for module in (main, sprites, blockgrid, levels)]
+    for module, _ in saved:
+        for name, value in values.items():
+            setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, old in saved:
+            for name, value in old.items():
+                setattr(module, name, value)
+
+
+# scene scripts, called before every frame
+def many_projectiles(game, frame, rng):
+    game.player.laser_amount = 10
+    if frame % 4 == 0:
+        game.create_projectile()
+
+
+# hearts only, a paddle growing from caught size upgrades would dominate the timings
+def many_upgrades(game, frame, rng):
+    for _ in range(2):
+        pos = (rng.randint(20, WINDOW_WIDTH - 20), rng.randint(0, WINDOW_HEIGHT // 2))
+        sprites.Upgrade.acquire(pos, 'heart', [game.all_sprites, game.upgrade_sprites])
+
+
+# a few hundred balls in play, split again whenever too many got lost
+def multi_ball(game, frame, rng):
+    while len(game.balls) < 200:
+        game.balls.split()
+
+
+def theme_switches(game, frame, rng):
+    if frame % 30 == 0:
+        game.change_theme('theme2' if game.surfacemaker.theme == 'theme1' else 'theme1')
+
+
+def level_transitions(game, frame, rng):
+    if frame % 60 == 59:
+        for block in list(game.block_sprites):
+            block.kill()
+
+
+SCENES = {
+    'full': (BLOCK_MAP, None),
+    'sparse': (SPARSE_MAP, None),
+    'enlarged': (ENLARGED_MAP, None),
+    'projectiles': (BLOCK_MAP, many_projectiles),
+    'upgrades': (BLOCK_MAP, many_upgrades),
+    'balls': (BLOCK_MAP, multi_ball),
+    'themes': (BLOCK_MAP, theme_switches),
+    'levels': (BLOCK_MAP, level_transitions),
+}
+
+
+def run_scene(name, frames=600, warmup=30, seed=1):
+    rows, script = SCENES[name]
+    rng = random.Random(seed)
+    timer = PhaseTimer()
+    with block_map(rows):
+        game = Game(seed=seed, scores=':memory:')
+        game.started = True
+        game.balls.active = True
+
+        timer.wrap(game.all_sprites, 'update', 'update')
+        timer.wrap(balls.Balls, 'update', 'update')
+        for method in ('upgrade_collision', 'projectile_block_collision', 'check_level_complete'):
+            timer.wrap(game, method, 'collisions')
+        timer.wrap(game, 'reset_level', 'level')
+        timer.wrap(game, 'change_theme', 'theme')
+        timer.wrap(game, 'draw_play', 'draw')
+        timer.wrap(game.crt, 'draw', 'crt')
+        timer.wrap(game.screen, 'present', 'display')
+        timer.wrap(game.next_level, 'step', 'prebuild')
+        try:
+            for frame in range(warmup + frames):
+                if script:
+                    script(game, frame, rng)
+                autopilot(game)
+                start = time.perf_counter()
+                game.play(1 / 60)
+                timer.end_frame(time.perf_counter() - start)
+        finally:
+            timer.restore()
+
+    timer.frames = timer.frames[warmup:]
+    return timer.summary()
+
+
+def suite(frames=600, names=None):
+    return {name: run_scene(name, frames) for name in names or SCENES}
+
+
+def print_suite(results):
+    for scene, phases in results.items():
+        print(scene)
+        for phase, result in phases.items():
+            print(f"  {phase:>11}: {result['p50_ms']:7.3f} ms p50 {result['p99_ms']:7.3f} ms p99")
+
+
+# phases whose p50 grew past the tolerance, tiny phases are left to noise
+def regressions(results, baseline, tolerance=0.25, floor_ms=0.05):
+    found = []
+    for scene, phases in results.items():
+        for phase, result in phases.items():
+            old = baseline.get(scene, {}).get(phase)
+            if old is None:
+                continue
+            if result['p50_ms'] > old['p50_ms'] * (1 + tolerance) and result['p50_ms'] - old['p50_ms'] > floor_ms:
+                found.append((scene, phase, old['p50_ms'], result['p50_ms']))
+    return found
+
+
+# python memory held after two equal windows of steady laser heavy frames, and how far the sprite pools grew
+# the first window can still fill caches and free lists once, memory that grows in both keeps growing
+# sprite groups resize their dicts as sprites come and go, shorter windows cannot tell that from growth
+def allocations(frames=600, warmup=900, seed=1, shortest=300):
+    frames = max(frames, shortest)
+    game = Game(seed=seed, scores=':memory:')
+    game.started = True
+    game.balls.active = True
+    game.player.laser_amount = 10
+    # sprites of each pool in use, blocks of the prebuilt next level included
+    pools = {
+        sprites.Block: lambda: len(game.block_sprites) + len(game.next_level.grid or ()),
+        sprites.Projectile: lambda: len(game.projectile_sprites),
+        sprites.Upgrade: lambda: len(game.upgrade_sprites),
+    }
+    peak = dict.fromkeys(pools, 0)
+
+    def play(count):
+        for frame in range(count):
+            if frame % 4 == 0:
+                game.create_projectile()
+            autopilot(game)
+            game.play(1 / 60)
+            for pool, alive in pools.items():
+                peak[pool] = max(peak[pool], alive())
+
+    play(warmup)
+    created = {pool: pool.created for pool in pools}
+    tracemalloc.start()
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    snapshots = [tracemalloc.take_snapshot().filter_traces(ignore)]
+    for window in range(2):
+        play(frames)
+        snapshots.append(tracemalloc.take_snapshot().filter_traces(ignore))
+    tracemalloc.stop()
+
+    growth = [sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+              for before, after in zip(snapshots, snapshots[1:])]
+    return {
+        'bytes_per_frame': [window / frames for window in growth],
+        'built': {pool.__name__: pool.created - created[pool] for pool in pools},
+        # a pool holding more sprites than were ever alive at once lost some instead of reusing them
+        'overgrown': {pool.__name__: pool.created - peak[pool] for pool in pools if pool.created > peak[pool]},
+        'pools': {pool.__name__: pool.cache_info() for pool in pools},
+    }
+
+
+# single ball play in Game and BatchSimulation given the same inputs, the first tick where they part as
+# (tick, game, simulation) with paddle x, ball x and y, score, level and hearts, or None when they never do
+# upgrade drops and ball launch directions come from different random numbers, so drops are off
+# and the simulated ball takes the direction the game picked whenever a level starts
+def lockstep(ticks=20000, seed=1):
+    game = Game(seed=seed, scores=':memory:')
+    simulation = BatchSimulation(1, seed=seed)
+    simulation.create_upgrades = lambda games, center_x, center_y: None
+
+    def no_drop(pos):
+        pass
+
+    level = None
+    for tick in range(ticks):
+        if game.level != level:
+            level = game.level
+            game.next_level.create_upgrade = no_drop
+            for block in [*game.block_sprites, *(game.next_level.grid or ())]:
+                block.create_upgrade = no_drop
+            simulation.ball_dir[0] = game.balls.direction[0]
+
+        # follow the ball, and every 6000 ticks look away for a while so hearts are lost too
+        offset = simulation.ball_x[0] + BALL_SIZE / 2 - simulation.paddle_width[0] / 2 + 5 - simulation.paddle_x[0]
+        move = int(offset > 2) - int(offset < -2)
+        if tick % 6000 >= 5700:
+            move = -move
+        game.tick((INPUT_LEFT if move < 0 else INPUT_RIGHT if move > 0 else 0) | INPUT_FIRE)
+        simulation.step([move], [True])
+
+        played = (game.player.rect.x, *game.balls.rect_pos[0].tolist(), game.score_value, game.level, game.player.hearts)
+        simulated = tuple(int(value[0]) for value in (simulation.paddle_x, simulation.ball_x, simulation.ball_y,
+                                                      simulation.score, simulation.level, simulation.hearts))
+        if played != simulated or len(game.balls) != 1:
+            return tick, played, simulated
+        if simulation.done[0]:
+            return None
+    return None
+
+
+def report(results):
+    for mode, result in results.items():
+        print(f"{mode:>8}: {result['mean_ms']:.3f} ms mean, {result['p50_ms']:.3f} ms p50")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='gameplay frame benchmarks')
+    parser.add_argument('frames', nargs='?', type=int, default=600)
+    parser.add_argument('--scene', action='append', choices=list(SCENES), help='only run these scenes')
+    parser.add_argument('--save', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', help='fail if a phase is slower than in this baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--allocations', action='store_true', help='only check steady frames for allocations')
+    parser.add_argument('--lockstep', action='store_true', help='only check Game against BatchSimulation tick by tick')
+    parser.add_argument('--max-bytes-per-frame', type=float, default=256,
+                        help='fail --allocations when both windows hold more Python memory than this per frame')
+    args = parser.parse_args()
+
+    if args.lockstep:
+        for seed in (1, 2, 3):
+            parted = lockstep(seed=seed)
+            if parted:
+                tick, played, simulated = parted
+                print(f"failed: seed {seed} parted at tick {tick}, game {played}, simulation {simulated}")
+                sys.exit(1)
+        print('Game and BatchSimulation stayed in lockstep')
+        sys.exit(0)
+
+    if args.allocations:
+        result = allocations(args.frames)
+        first, second = result['bytes_per_frame']
+        print(f"{first:.1f} and {second:.1f} bytes held per frame, sprites built: {result['built']}")
+        for name, info in result['pools'].items():
+            print(f"{name:>11}: {info}")
+
+        # pools grow to the most sprites alive at once, upgrades drop at random so that can rise after warm-up
+        failed = False
+        if result['overgrown']:
+            print(f"failed: pools built more sprites than were ever alive at once: {result['overgrown']}")
+            failed = True
+        if min(first, second) > args.max_bytes_per_frame:
+            print(f"failed: memory kept growing, more than {args.max_bytes_per_frame:.0f} bytes per frame in both windows")
+            failed = True
+        sys.exit(1 if failed else 0)
+
+    # first, while no asset is cached yet
+    for stage, ms in startup().items():
+        print(f"{stage:>12}: {ms:.1f} ms")
+    report(render_modes(args.frames))
+    report(render_scales(args.frames))
+    report(crt_tiers())
+
+    results = suite(args.frames, args.scene)
+    print_suite(results)
+    pygame.quit()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'frames': args.frames, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        slower = regressions(results, baseline, args.tolerance)
+        for scene, phase, old, new in slower:
+            print(f"regression: {scene} {phase} {old:.3f} -> {new:.3f} ms p50")
+        sys.exit(1 if slower else 0)
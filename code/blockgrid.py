@@ -0,0 +1,95 @@
+import pygame
+from settings import *
+
+
+class BlockGrid(pygame.sprite.Group):
+    def __init__(self, *sprites):
+        # every block sits on the BLOCK_MAP grid, so one cell per map slot
+        self.cell_width = BLOCK_WIDTH + GAP_SIZE
+        self.cell_height = BLOCK_HEIGHT + GAP_SIZE
+        self.top = TOP_OFFSET
+        self.cells = {}
+        # lowest block of every column, what anything travelling straight up runs into first
+        self.columns = {}
+        self.last_row = -1
+        # bumped whenever a block joins or leaves, so others can tell their copy of the grid is stale
+        self.version = 0
+        # areas where a block joined, left or changed its look since the board layer last painted
+        self.changed = []
+        super().__init__(*sprites)
+
+    def cell_range(self, rect):
+        # all cells the rect overlaps
+        first_col = int(rect.left // self.cell_width)
+        last_col = int((rect.right - 1) // self.cell_width)
+        first_row = int((rect.top - self.top) // self.cell_height)
+        last_row = int((rect.bottom - 1 - self.top) // self.cell_height)
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                yield row, col
+
+    def add_internal(self, sprite, layer=None):
+        super().add_internal(sprite, layer)
+        self.version += 1
+        self.changed.append(sprite.rect.copy())
+        for row, col in self.cell_range(sprite.rect):
+            self.cells.setdefault((row, col), []).append(sprite)
+            self.last_row = max(self.last_row, row)
+            lowest = self.columns.get(col)
+            if lowest is None or sprite.rect.bottom > lowest.rect.bottom:
+                self.columns[col] = sprite
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        self.version += 1
+        self.changed.append(sprite.rect.copy())
+        for cell in self.cell_range(sprite.rect):
+            blocks = self.cells.get(cell)
+            if blocks and sprite in blocks:
+                blocks.remove(sprite)
+                if not blocks:
+                    del self.cells[cell]
+            if self.columns.get(cell[1]) is sprite:
+                self.update_column(cell[1])
+
+    # everything leaves at once, so drop the index instead of keeping it right block by block
+    def empty(self):
+        self.cells = {}
+        self.columns = {}
+        self.last_row = -1
+        super().empty()
+        self.changed = []
+
+    # a block that stays but looks different, pooled rects are reused so keep a copy
+    def repaint(self, sprite):
+        self.changed.append(sprite.rect.copy())
+
+    def update_column(self, col):
+        # the lowest occupied cell holds the block reaching furthest down
+        for row in range(self.last_row, -1, -1):
+            blocks = self.cells.get((row, col))
+            if blocks:
+                self.columns[col] = max(blocks, key=lambda block: block.rect.bottom)
+                return
+        self.columns.pop(col, None)
+
+    def query(self, rect):
+        # only look at the blocks in the cells the rect touches
+        found = {}
+        for cell in self.cell_range(rect):
+            for sprite in self.cells.get(cell, ()):
+                if sprite.rect.colliderect(rect):
+                    found[sprite] = None
+        return list(found)
+
+    # the one block something moving straight up hits, a lookup per column instead of a search
+    def first_above(self, rect):
+        found, best = None, None
+        for col in range(int(rect.left // self.cell_width), int((rect.right - 1) // self.cell_width) + 1):
+            block = self.columns.get(col)
+            if block and block.rect.colliderect(rect):
+                # straddling two columns, the lower block comes first, then the one covered more
+                key = (block.rect.bottom, min(rect.right, block.rect.right) - max(rect.left, block.rect.left))
+                if best is None or key > best:
+                    found, best = block, key
+        return found
@@ -0,0 +1,42 @@
+# the background with every block already painted on, blocks never move so a frame needs one blit for all of them
+class BoardLayer:
+    def __init__(self, background, screen):
+        self.screen = screen
+        self.background = screen.image(background)
+        self.surface = self.background.copy()
+        self.grid = None
+        self.stale = True
+
+    # a new level or theme, the whole board is painted again with the next update
+    def rebuild(self, grid):
+        self.grid = grid
+        self.stale = True
+
+    def blocks(self, blocks):
+        image, point = self.screen.image, self.screen.point
+        return [(image(block.image), point(block.rect.topleft)) for block in blocks]
+
+    # repaint where blocks joined, changed or left since the last call and return those areas in frame pixels
+    def update(self):
+        if self.stale:
+            self.stale = False
+            self.grid.changed = []
+            self.surface.blit(self.background, (0, 0))
+            self.surface.blits(self.blocks(self.grid), doreturn=False)
+            return [self.surface.get_rect()]
+
+        changed = self.grid.changed
+        if not changed:
+            return changed
+        self.grid.changed = []
+        areas = []
+        for rect in changed:
+            area = self.screen.rect(rect)
+            areas.append(area)
+            # clipped, so a neighbour reaching into the area is not blended over itself outside of it
+            self.surface.set_clip(area)
+            self.surface.blit(self.background, area, area)
+            nearby = self.grid.query(rect.inflate(self.screen.margin * 2, self.screen.margin * 2))
+            self.surface.blits(self.blocks(nearby), doreturn=False)
+        self.surface.set_clip(None)
+        return areas
@@ -0,0 +1,95 @@
+import pygame, json, mmap, os, struct
+
+# file layout: magic, index length, json index, then raw RGBA pixels of every image
+MAGIC = b'BBGFX002'
+HEADER = struct.Struct('<8sI')
+ALIGN = 16
+
+
+# all graphics pre-decoded into one memory mapped file
+class Bundle:
+    def __init__(self, path, root):
+        self.root = root
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, index_size = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a graphics bundle')
+        # name -> (offset, width, height, size, mtime) with size and mtime of the png it was built from
+        self.index = json.loads(self.data[HEADER.size:HEADER.size + index_size])
+        # whether each entry still matches its png, looked up once
+        self.fresh = {}
+        self.start = aligned(HEADER.size + index_size)
+        self.view = memoryview(self.data)
+
+    # None when there is no usable bundle, the caller then loads the files themselves
+    @staticmethod
+    def open(path, root):
+        try:
+            return Bundle(path, root)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    # only entries whose png is unchanged since the bundle was built, anything else loads from the directory
+    def __contains__(self, name):
+        if name not in self.fresh:
+            entry = self.index.get(name)
+            self.fresh[name] = entry is not None and entry[3:] == stamp(os.path.join(self.root, name))
+        return self.fresh[name]
+
+    # the surface reads its pixels straight from the mapped file
+    def image(self, name):
+        offset, width, height = self.index[name][:3]
+        offset += self.start
+        return pygame.image.frombuffer(self.view[offset:offset + width * height * 4], (width, height), 'RGBA')
+
+
+def aligned(size):
+    return -(-size // ALIGN) * ALIGN
+
+
+# size and modification time of a source file, None once it is gone
+def stamp(path):
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return [info.st_size, info.st_mtime_ns]
+
+
+# decode every png below root and pack the pixels into one file
+def build(root, output):
+    names = []
+    for folder, _, files in os.walk(os.path.join(root, 'graphics')):
+        for file in files:
+            if file.endswith('.png'):
+                names.append(os.path.relpath(os.path.join(folder, file), root).replace(os.sep, '/'))
+    names.sort()
+
+    images = [pygame.image.load(os.path.join(root, name)) for name in names]
+
+    # offsets count from the start of the pixel data, every image starts aligned
+    index = {}
+    offset = 0
+    for name, image in zip(names, images):
+        index[name] = (offset, image.get_width(), image.get_height(), *stamp(os.path.join(root, name)))
+        offset += aligned(image.get_width() * image.get_height() * 4)
+    index = json.dumps(index, separators=(',', ':')).encode()
+
+    with open(output, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(index)))
+        f.write(index)
+        for image in images:
+            f.write(b'\0' * (aligned(f.tell()) - f.tell()))
+            f.write(pygame.image.tobytes(image, 'RGBA'))
+    return len(names)
+
+
+if __name__ == '__main__':
+    from assets import BASE_DIR
+    from settings import ASSET_BUNDLE
+
+    output = os.path.join(BASE_DIR, ASSET_BUNDLE)
+    count = build(BASE_DIR, output)
+    print(f'packed {count} images into {output} ({os.path.getsize(output) / 1024:.0f} KB)')
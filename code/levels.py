@@ -0,0 +1,148 @@
+import os, random
+from itertools import islice
+from settings import *
+from sprites import Block
+from blockgrid import BlockGrid
+from assets import assets
+
+MAX_HEALTH = len(COLOR_LEGEND)
+
+
+# raise every block by amount, the strongest color is as far as it goes
+def level_up(rows, amount):
+    return [''.join(col if col == ' ' else str(min(int(col) + amount, MAX_HEALTH)) for col in row) for row in rows]
+
+
+# every source hands out layouts in the BLOCK_MAP format, the block grid needs the same shape
+def check_layout(rows, name):
+    if len(rows) != len(BLOCK_MAP) or any(len(row) != len(BLOCK_MAP[0]) for row in rows):
+        raise ValueError(f'{name}: a level has to be {len(BLOCK_MAP[0])} columns by {len(BLOCK_MAP)} rows')
+    for row in rows:
+        for col in row:
+            if col != ' ' and col not in COLOR_LEGEND:
+                raise ValueError(f'{name}: unknown block {col!r}')
+    return rows
+
+
+# the one map of the game, a little stronger every level
+class MapLevels:
+    def __init__(self, block_map):
+        self.block_map = block_map
+
+    def layout(self, level):
+        return level_up(self.block_map, level - 1)
+
+
+# one text file per level, '.' or space for no block, the files repeat stronger once all were played
+class FileLevels:
+    def __init__(self, folder=LEVEL_DIR):
+        folder = assets.path(folder)
+        self.layouts = []
+        for name in sorted(os.listdir(folder)):
+            if name.endswith('.txt'):
+                with open(os.path.join(folder, name)) as f:
+                    rows = [line.rstrip('\n').replace('.', ' ').ljust(len(BLOCK_MAP[0])) for line in f]
+                self.layouts.append(check_layout(rows, name))
+        if not self.layouts:
+            raise ValueError(f'no level files in {folder}')
+
+    def layout(self, level):
+        rounds, index = divmod(level - 1, len(self.layouts))
+        return level_up(self.layouts[index], rounds)
+
+
+# mirrored random layouts, the same for a seed and level so replays see the same board
+class RandomLevels:
+    def __init__(self, seed):
+        self.seed = seed
+
+    def layout(self, level):
+        rng = random.Random(f'{self.seed}:{level}')
+        cols = len(BLOCK_MAP[0])
+        half = (cols + 1) // 2
+        filled = sum(1 for row in BLOCK_MAP if row.strip())
+        density = min(0.9, 0.5 + level * 0.05)
+
+        rows = []
+        for row_index in range(len(BLOCK_MAP)):
+            if row_index >= filled:
+                rows.append(' ' * cols)
+                continue
+            # higher rows are stronger
+            strength = filled - row_index + (level - 1) // 2
+            left = [str(min(MAX_HEALTH, max(1, strength + rng.randint(-1, 1)))) if rng.random() < density else ' '
+                    for _ in range(half)]
+            rows.append(''.join(left + left[:cols - half][::-1]))
+
+        if not any(row.strip() for row in rows):
+            rows[0] = '1' * cols
+        return rows
+
+
+def level_source(kind, seed, block_map=BLOCK_MAP):
+    if kind == 'map':
+        return MapLevels(block_map)
+    if kind == 'files':
+        return FileLevels()
+    if kind == 'random':
+        return RandomLevels(seed)
+    raise ValueError(f'unknown level source: {kind}')
+
+
+# the blocks of the next level, put together a few at a time while the current one is played
+class LevelBuilder:
+    def __init__(self, surfacemaker, create_upgrade):
+        self.surfacemaker = surfacemaker
+        self.create_upgrade = create_upgrade
+        self.source = None
+
+        self.level = None
+        self.grid = None
+        self.pending = iter(())
+
+    def use(self, source):
+        self.discard()
+        self.source = source
+
+    # start on level in a grid of its own, nothing of it shows until take
+    def prepare(self, level):
+        self.discard()
+        self.level = level
+        self.grid = BlockGrid()
+        self.pending = self.blocks(self.source.layout(level))
+
+    def blocks(self, rows):
+        for row_index, row in enumerate(rows):
+            for col_index, col in enumerate(row):
+                if col != ' ':
+                    # find the x and y position for each individual block
+                    x = col_index * (BLOCK_WIDTH + GAP_SIZE) + GAP_SIZE // 2
+                    y = TOP_OFFSET + row_index * (BLOCK_HEIGHT + GAP_SIZE) + GAP_SIZE // 2
+                    yield col, (x, y)
+
+    # a few blocks with the time left over after a frame, all of them for None
+    def step(self, count=LEVEL_PREBUILD_STEPS):
+        for block_type, pos in islice(self.pending, count):
+            Block.acquire(block_type, pos, [self.grid], self.surfacemaker, self.create_upgrade)
+
+    # the finished grid of level, whatever was not prepared yet is built now
+    def take(self, level):
+        if level != self.level:
+            self.prepare(level)
+        self.step(None)
+        grid = self.grid
+        self.level, self.grid = None, None
+        return grid
+
+    # blocks built for a level that will not come go back to the pool
+    def discard(self):
+        if self.grid:
+            for block in self.grid.sprites():
+                block.kill()
+        self.level, self.grid = None, None
+        self.pending = iter(())
+
+    def change_theme(self):
+        if self.grid:
+            for block in self.grid:
+                block.change_theme()
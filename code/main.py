@@ -1,176 +1,279 @@
-import pygame, sys, time
+import pygame, argparse, os, random, sys, time
 from settings import *
-from sprites import Player, Ball, Block, Upgrade, Projectile
+from sprites import Player, Block, Upgrade, Projectile
+from balls import Balls
+from levels import LevelBuilder, level_source
 from surfacemaker import SurfaceMaker
-from random import choice, randint
+from blockgrid import BlockGrid
+from board import BoardLayer
+from screen import Screen
+from textcache import TextCache
+from scenes import GameplayScene, MenuScene
+from assets import assets
+from music import MusicPlayer
+from audio import VoiceManager
+from startup import StartupProfiler
+from replay import Recorder
+from scores import ScoreStore
+from profiler import FrameProfiler, PROFILER_KEY
+from random import choice
+from functools import cached_property
 
 
 class Game:
-    def __init__(self):
-
-        # general setup
-        pygame.init()
-        self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption('Breakout')
+    def __init__(self, seed=None, render_scale=RENDER_SCALE, window_size=WINDOW_SIZE, scores=None):
+        self.startup = StartupProfiler()
+
+        # general setup, only the pygame modules the game uses
+        with self.startup.stage('pygame init'):
+            pygame.display.init()
+            pygame.font.init()
+            pygame.mixer.init()
+            self.screen = Screen(render_scale, window_size)
+            self.display_surface = self.screen.surface
+            pygame.display.set_caption('Breakout')
+
+        # everything the first screen needs is decoded on worker threads while the rest is set up
+        with self.startup.stage('prefetch'):
+            assets.prefetch(self.first_screen_files())
 
         #game mode
         self.game_mode = ["START", "OPTIONS", "QUIT", "PAUSE"]
-        self.current_mode = "START"
         self.started = False
 
         #option choice
         self.setting_options = ["THEME", "VOLUME", "CREDITS", "BACK"]
-        self.current_selection = None
 
         #theme choice
         self.theme_options = ["90s", "80s"]
         self.current_theme = "90s"
+        self.theme_switch_time = 0
 
-        # main background
-        self.bg = self.create_bg("8bit_bg")
-
-        #menu UI images
-        self.cursor = pygame.image.load('../graphics/cursor/cursor.png').convert_alpha()
-        self.start_menu = pygame.image.load('../graphics/background/start_menu.png').convert_alpha()
+        with self.startup.stage('images'):
+            # main background
+            self.bg = self.create_bg("8bit_bg")
+            # the background with the blocks of the level on it
+            self.board = BoardLayer(self.bg, self.screen)
 
-        #score and level fonts
-        self.hs_font = pygame.font.Font('../graphics/font/BungeeTint-Regular.ttf', 32)
-        self.score_level_font = pygame.font.Font('../graphics/font/SairaStencilOne-Regular.ttf', 28)
+            #menu UI images
+            self.cursor = assets.image('graphics/cursor/cursor.png')
+            self.start_menu = assets.image('graphics/background/start_menu.png')
 
-        #game over fonts
-        self.game_over_font = pygame.font.Font('../graphics/font/BungeeTint-Regular.ttf', 70)
-        self.secondary_font = pygame.font.Font('../graphics/font/SairaStencilOne-Regular.ttf', 40)
+        with self.startup.stage('fonts'):
+            #score and level fonts
+            self.hs_font = assets.font('graphics/font/BungeeTint-Regular.ttf', 32)
+            self.score_level_font = assets.font('graphics/font/SairaStencilOne-Regular.ttf', 28)
 
-        #option background
-        self.options_bg = self.create_bg("options_bg")
+            #rendered text reused until it changes
+            self.text = TextCache()
 
-        #options UI
-        self.options_header = pygame.image.load('../graphics/font/text_images/options_header.png').convert_alpha()
-        self.option_theme = pygame.image.load('../graphics/font/text_images/theme.png').convert_alpha()
-        self.option_volume = pygame.image.load('../graphics/font/text_images/volume.png').convert_alpha()
-        self.option_credits = pygame.image.load('../graphics/font/text_images/credits.png').convert_alpha()
-        self.theme90s = pygame.image.load('../graphics/font/text_images/theme90s.png').convert_alpha()
-        self.theme80s = pygame.image.load('../graphics/font/text_images/theme80s.png').convert_alpha()
+            #game over fonts
+            self.game_over_font = assets.font('graphics/font/BungeeTint-Regular.ttf', 70)
+            self.secondary_font = assets.font('graphics/font/SairaStencilOne-Regular.ttf', 40)
 
-        self.back_button = pygame.image.load('../graphics/other/back.png').convert_alpha()
-        self.volume_cursor = pygame.image.load('../graphics/cursor/volume_cursor.png').convert_alpha()
-
-        #credits background
-        self.credit_bg = self.create_bg("credit_bg")
+        # frame phase timings, shown with the profiler hotkey
+        self.profiler = FrameProfiler()
 
         # sprite group setup
         self.all_sprites = pygame.sprite.Group()
-        self.block_sprites = pygame.sprite.Group()
+        self.block_sprites = BlockGrid()
         self.upgrade_sprites = pygame.sprite.Group()
         self.projectile_sprites = pygame.sprite.Group()
 
-        #highscore tracking
-        self.highscore = self.retrieve_highscore()
+        #highscore tracking, every finished game is written to the score store in the background
+        # the player's own file unless given another path, ':memory:' for runs that should not keep their scores
+        with self.startup.stage('scores'):
+            if scores is None:
+                self.scores = ScoreStore(assets.path(SCORE_DB), legacy=assets.path(LEGACY_HIGHSCORE))
+            else:
+                self.scores = ScoreStore(scores)
+            self.highscore = self.scores.best()
 
-        #score and level setup
-        self.score_value = 0
-        self.projectilekills = 0
-        self.level = 1
+        # sound effects, played through reserved mixer channels
+        with self.startup.stage('sounds'):
+            self.sounds = VoiceManager()
 
         # graphics and related setup
-        self.surfacemaker = SurfaceMaker()
-        self.player = Player(self.all_sprites, self.surfacemaker)
-        self.stage_setup()
-        self.ball = Ball(self.all_sprites, self.player, self.block_sprites)
+        with self.startup.stage('theme'):
+            self.surfacemaker = SurfaceMaker()
 
-        self.ball.scale_speed_based_on_level(self.level)
+        # the next level is put together in the spare time after frames
+        self.next_level = LevelBuilder(self.surfacemaker, self.create_upgrade)
 
-        # hearts
-        self.heart_surf = pygame.image.load('../graphics/other/heart.png').convert_alpha()
+        with self.startup.stage('level'):
+            # hearts
+            self.heart_surf = assets.image('graphics/other/heart.png')
 
-        #projectile (animated)
-        self.projectile_frames = [
-            pygame.image.load('../graphics/laser/LaserShot' + f'{i}.png') for i in range(1, 7)
-        ]
+            # score bar
+            self.overlay_surf = pygame.Surface((WINDOW_WIDTH, 40), pygame.SRCALPHA)
+            self.overlay_surf.fill((0, 0, 0, 150))
 
-        # laser setting
-        self.can_shoot = True
-        self.shoot_time = 0
+            # rendering, dirty mode only redraws the regions that changed
+            self.dirty_rendering = DIRTY_RENDERING
+            self.draw_items = []
+            self.previous_items = None
+
+            #projectile (animated)
+            self.projectile_frames = [
+                assets.image(f'graphics/laser/LaserShot{i}.png') for i in range(1, 7)
+            ]
+
+            # fixed timestep state
+            self.previous_positions = {}
+
+            self.new_game(seed)
 
         # crt UI
-        self.crt = CRT()
+        with self.startup.stage('crt'):
+            self.crt = CRT(self.screen)
 
         #music
-        self.laser_sound = pygame.mixer.Sound('../sounds/laser.wav')
-        self.laser_sound.set_volume(0.1)
+        with self.startup.stage('music'):
+            self.music = MusicPlayer(MUSIC_TRACKS)
+            self.music.play()
+
+        # scene stack and frame cap
+        self.clock = pygame.time.Clock()
+        self.scenes = [GameplayScene(self)]
+
+    # menu screens, loaded the first time they are opened
+    @cached_property
+    def options_header(self):
+        return assets.image('graphics/font/text_images/options_header.png')
 
-        self.powerup_sound = pygame.mixer.Sound('../sounds/powerup.wav')
-        self.powerup_sound.set_volume(0.1)
+    @cached_property
+    def option_theme(self):
+        return assets.image('graphics/font/text_images/theme.png')
 
-        self.laserhit_sound = pygame.mixer.Sound('../sounds/laser_hit.wav')
-        self.laserhit_sound.set_volume(0.02)
+    @cached_property
+    def option_volume(self):
+        return assets.image('graphics/font/text_images/volume.png')
 
-        self.music = pygame.mixer.Sound('../sounds/funmusic.mp3')
-        self.music.set_volume(0.1)
-        self.music.play(loops=-1)
+    @cached_property
+    def option_credits(self):
+        return assets.image('graphics/font/text_images/credits.png')
+
+    @cached_property
+    def theme90s(self):
+        return assets.image('graphics/font/text_images/theme90s.png')
+
+    @cached_property
+    def theme80s(self):
+        return assets.image('graphics/font/text_images/theme80s.png')
+
+    @cached_property
+    def back_button(self):
+        return assets.image('graphics/other/back.png')
+
+    @cached_property
+    def volume_cursor(self):
+        return assets.image('graphics/cursor/volume_cursor.png')
+
+    @cached_property
+    def options_bg(self):
+        return self.create_bg('options_bg')
+
+    @cached_property
+    def credit_bg(self):
+        return self.create_bg('credit_bg')
+
+    @cached_property
+    def profiler_font(self):
+        return assets.font('graphics/font/SairaStencilOne-Regular.ttf', 18)
+
+    # the menu images above, decoded in the background once the first frame is shown
+    @staticmethod
+    def menu_files():
+        return ['graphics/font/text_images/options_header.png', 'graphics/font/text_images/theme.png',
+                'graphics/font/text_images/volume.png', 'graphics/font/text_images/credits.png',
+                'graphics/font/text_images/theme90s.png', 'graphics/font/text_images/theme80s.png',
+                'graphics/other/back.png', 'graphics/cursor/volume_cursor.png',
+                'graphics/background/options_bg.png', 'graphics/background/credit_bg.png']
+
+    @staticmethod
+    def first_screen_files():
+        files = ['graphics/background/8bit_bg.png', 'graphics/cursor/cursor.png',
+                 'graphics/background/start_menu.png', 'graphics/other/heart.png',
+                 'graphics/other/ball.png', 'graphics/other/laser.png',
+                 'graphics/background/tv.png']
+        files += [f'graphics/upgrades/{upgrade}.png' for upgrade in UPGRADES]
+        files += [f'graphics/laser/LaserShot{i}.png' for i in range(1, 7)]
+        files += [effect[0] for effect in SOUND_EFFECTS.values()]
+        return files + SurfaceMaker.theme_names('theme1')
+
+    # after the first frame, decode the menus and the other theme in the background
+    def warm_up(self):
+        assets.prefetch(self.menu_files() + SurfaceMaker.theme_names('theme2'))
 
     # create upgrade items
     def create_upgrade(self, pos):
         upgrade_type = choice(UPGRADES)
-        Upgrade(pos, upgrade_type, [self.all_sprites, self.upgrade_sprites])
+        upgrade = Upgrade.acquire(pos, upgrade_type, [self.all_sprites, self.upgrade_sprites])
+        # a reused sprite must not be drawn sliding in from where it was in its last life
+        self.previous_positions.pop(upgrade, None)
 
     # create scaled background
     def create_bg(self, image_name):
-        bg_original = pygame.image.load(f'../graphics/background/{image_name}.png').convert()
+        bg_original = assets.image(f'graphics/background/{image_name}.png', alpha=False)
         scale_factor = WINDOW_HEIGHT / bg_original.get_height()
         scaled_width = bg_original.get_width() * scale_factor
         scaled_height = bg_original.get_height() * scale_factor
         scaled_bg = pygame.transform.scale(bg_original, (scaled_width, scaled_height))
         return scaled_bg
 
-    def level_up_block(self, column):
-        col = int(column)
-        level_up = self.level - 1
-        if level_up + col < 7:
-            col = level_up + col
-        elif level_up + col >= 7:
-            col = 7
-        return str(col)
-
-    # block setup for stage
-    def stage_setup(self):
-        vertical_padding = 0
-        # cycle through all rows and columns of BLOCK MAP
-        for row_index, row in enumerate(BLOCK_MAP):
-            for col_index, col in enumerate(row):
-                if col != ' ':
-                    if self.level > 1:
-                        col = self.level_up_block(col)
-                    # find the x and y position for each individual block
-                    x = col_index * (BLOCK_WIDTH + GAP_SIZE) + GAP_SIZE // 2
-                    y = TOP_OFFSET + vertical_padding + row_index * (BLOCK_HEIGHT + GAP_SIZE) + GAP_SIZE // 2
-                    Block(col, (x, y), [self.all_sprites, self.block_sprites], self.surfacemaker, self.create_upgrade)
-
-    # saving highscore to text file
-    @staticmethod
-    def save_highscore(highscore):
-        with open("highscore.txt", "w") as f:
-            f.write(str(highscore))
+    # a fresh run from level one, everything random in it follows from the seed
+    def new_game(self, seed=None):
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        random.seed(self.seed)
 
-    # retrieving highscore from text file
-    @staticmethod
-    def retrieve_highscore():
-        with open("highscore.txt", "r") as f:
-            highscore = f.read()
-            return int(highscore)
+        #score and level setup
+        self.score_value = 0
+        self.projectilekills = 0
+        self.level = 0
+
+        # fixed steps so far and the presses waiting for the next one
+        self.ticks = 0
+        self.inputs = 0
+        self.accumulator = 0
+
+        # laser setting
+        self.can_shoot = True
+        self.shoot_tick = 0
+
+        self.recorder = Recorder(self.seed) if RECORD_REPLAYS else None
+        self.next_level.use(level_source(LEVEL_SOURCE, self.seed, BLOCK_MAP))
+        self.reset_level()
+
+    def save_recording(self):
+        if self.recorder and self.recorder.ticks:
+            os.makedirs(assets.path(REPLAY_DIR), exist_ok=True)
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.seed}.bbrec"
+            self.recorder.save(assets.path(REPLAY_DIR, name))
+        self.recorder = None
 
     # level reset logic
     def reset_level(self):
         self.level += 1
+        # the pooled sprites go back to their classes for the next level to reuse
+        pooled = [(Block, self.block_sprites.sprites()), (Upgrade, self.upgrade_sprites.sprites()),
+                  (Projectile, self.projectile_sprites.sprites())]
         self.all_sprites.empty()
         self.block_sprites.empty()
         self.upgrade_sprites.empty()
         self.projectile_sprites.empty()
+        for pool, sprites in pooled:
+            pool.release(sprites)
+        self.previous_positions = {}
         self.player = Player(self.all_sprites, self.surfacemaker)
-        self.stage_setup()
-        self.ball = Ball(self.all_sprites, self.player, self.block_sprites)
 
-        self.ball.scale_speed_based_on_level(self.level)
+        # swap in the prepared blocks and start on the level after this one
+        self.block_sprites = self.next_level.take(self.level)
+        self.board.rebuild(self.block_sprites)
+        self.next_level.prepare(self.level + 1)
+
+        self.balls = Balls(self.player, self.block_sprites, self.sounds)
+
+        self.balls.scale_speed_based_on_level(self.level)
 
     def check_level_complete(self):
         if not self.block_sprites:
@@ -180,148 +283,74 @@ class Game:
     def display_hearts(self):
         for i in range(self.player.hearts):
             x = 10 + i * (self.heart_surf.get_width() + 2)
-            self.display_surface.blit(self.heart_surf, (x, 10))
+            self.draw(self.heart_surf, (x, 10))
 
     # player upgrade logic
     def upgrade_collision(self):
         overlap_sprites = pygame.sprite.spritecollide(self.player, self.upgrade_sprites, True)
         for sprite in overlap_sprites:
-            self.player.upgrade(sprite.upgrade_type)
-            self.powerup_sound.play()
+            if sprite.upgrade_type == 'multi':
+                self.balls.split()
+            else:
+                self.player.upgrade(sprite.upgrade_type)
+            self.sounds.play('powerup')
 
     # projectile creation
     def create_projectile(self):
-        self.laser_sound.play()
+        self.sounds.play('laser')
         for projectile in self.player.laser_rects:
-            Projectile(projectile.midtop - pygame.math.Vector2(0, 30),
-                       [self.all_sprites, self.projectile_sprites],
-                       self.projectile_frames)
+            Projectile.acquire((projectile.centerx, projectile.top - 30),
+                               [self.all_sprites, self.projectile_sprites],
+                               self.projectile_frames)
 
     def laser_timer(self):
-        if pygame.time.get_ticks() - self.shoot_time >= 500:
+        if (self.ticks - self.shoot_tick) * FIXED_TIMESTEP >= 0.5:
             self.can_shoot = True
 
     # displaying score, level and highscore
     def score_update(self):
-        score = self.score_level_font.render(f"SCORE: {self.score_value}", True, (255, 255, 255))
-        level_display = self.score_level_font.render(f"Level: {self.level}", True, (255, 255, 255))
-        high_score_display = self.hs_font.render(f"High Score: {self.highscore}", True, (124, 255, 12))
+        score = self.text.number('score', self.score_level_font, "SCORE: ", self.score_value, (255, 255, 255))
+        level_display = self.text.number('level', self.score_level_font, "Level: ", self.level, (255, 255, 255))
+        high_score_display = self.text.number('highscore', self.hs_font, "High Score: ", self.highscore, (124, 255, 12))
 
-        self.display_surface.blit(score, (WINDOW_WIDTH - score.get_width() - 20, 0))
-        self.display_surface.blit(level_display, (20, WINDOW_HEIGHT - level_display.get_height()))
-        self.display_surface.blit(high_score_display, (WINDOW_WIDTH // 2 - high_score_display.get_width() // 2, 0))
+        self.draw(score, (WINDOW_WIDTH - score.get_width() - 20, 0))
+        self.draw(level_display, (20, WINDOW_HEIGHT - level_display.get_height()))
+        self.draw(high_score_display, (WINDOW_WIDTH // 2 - high_score_display.get_width() // 2, 0))
 
     # collision detection logic and score tracking
     def projectile_block_collision(self):
-        for projectile in self.projectile_sprites:
-            overlap_sprites = pygame.sprite.spritecollide(projectile, self.block_sprites, False)
-            if overlap_sprites:
-                for sprite in overlap_sprites:
-                    sprite.get_damage(1)
-                    projectile.kill()  # Remove the projectile
-                    self.laserhit_sound.play()
-                    self.projectilekills += 1
-                    self.score_value += 100
-                    if self.score_value >= self.highscore:
-                        self.highscore = self.score_value
-
-    # UI for volume adjustment
-    def display_volume(self, current_surface):
-        volume_position = [(950, 320), (990, 320), (1030, 320), (1070, 320), (1100, 320)]
-        volume_cursor = Cursor(self.volume_cursor, volume_position)
-
-        while True:
-            volume = volume_cursor.handle_input()
-            if volume is not None:
-                volume *= 0.25
-                for sound in [self.music, self.laserhit_sound, self.powerup_sound, self.laser_sound]:
-                    sound.set_volume(volume)
-                return
-
-            self.display_surface.blit(current_surface, (0, 0))
-            pygame.draw.rect(self.display_surface, (255, 117, 0), (950, 320, 160, 32))
-            volume_cursor.draw(self.display_surface)
-            pygame.display.update()
-
-    # UI for theme adjustment
-    def display_theme(self, current_surface):
-        theme_position = [(950, 230), (950, 270)]
-        theme_cursor = Cursor(self.cursor, theme_position)
-        while True:
-            theme_selection = theme_cursor.handle_input()
-            if theme_selection == 0:
-                for block in self.block_sprites:
-                    block.change_theme("theme1")
-                self.player.change_theme()
-                self.current_theme = "90s"
-                return
-            elif theme_selection == 1:
-                for block in self.block_sprites:
-                    block.change_theme("theme2")
-                self.player.change_theme()
-                self.current_theme = "80s"
-                return
-
-            self.display_surface.blit(current_surface, (0, 0))
-            self.display_surface.blit(self.theme90s, (1050, 220))
-            self.display_surface.blit(self.theme80s, (1050, 260))
-            theme_cursor.draw(self.display_surface)
-            pygame.display.update()
-
-    # frame for team credit
-    def display_credits(self):
-        back_position = [(50, 50)]
-        back_cursor = Cursor(self.cursor, back_position)
-        while True:
-            back = back_cursor.handle_input()
-            if back is not None:
-                self.current_mode = "OPTIONS"
-                return
-
-            self.display_surface.blit(self.credit_bg, (0, 0))
-            back_cursor.draw(self.display_surface)
-            pygame.display.update()
-
-    #UI for options
-    def display_options(self):
-        self.display_surface.blit(self.options_bg, (0, 0))
-        self.display_surface.blit(self.options_header, (WINDOW_WIDTH // 2 + 100, WINDOW_HEIGHT // 14))
-        self.display_surface.blit(self.option_theme, (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 4))
-        self.display_surface.blit(self.option_volume, (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 4 + 80))
-        self.display_surface.blit(self.option_credits, (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 4 + 160))
-        self.display_surface.blit(self.back_button, (WINDOW_WIDTH // 24, WINDOW_HEIGHT // 10))
-        self.crt.draw()
-        pygame.display.flip()
-
-        menu_position = [(610, 250), (610, 330), (610, 410), (55, 115)]
-
-        current_surface = self.display_surface.copy()
-        settings_cursor = Cursor(self.cursor, menu_position)
-
-        while self.current_mode != "START":
-            selected_option = settings_cursor.handle_input()
-            if selected_option is not None:
-                self.current_selection = self.setting_options[selected_option]
-                if self.current_selection == "VOLUME":
-                    self.display_volume(current_surface)
-                if self.current_selection == "THEME":
-                    self.display_theme(current_surface)
-                if self.current_selection == "CREDITS":
-                    self.display_credits()
-                if self.current_selection == "BACK":
-                    self.current_mode = "START"
-
-            self.current_selection = None
-            self.display_surface.blit(current_surface, (0, 0))
-            settings_cursor.draw(self.display_surface)
-            pygame.display.update()
+        # projectiles only fly straight up, so each one can only hit the lowest block of its columns;
+        # targets are picked from the blocks standing at the start of the step, in the order they were fired
+        targets = [(projectile, self.block_sprites.first_above(projectile.rect)) for projectile in self.projectile_sprites]
+        for projectile, sprite in targets:
+            if sprite and sprite.health > 0:
+                sprite.get_damage(1)
+                projectile.kill()  # Remove the projectile
+                self.sounds.play('laser hit')
+                self.projectilekills += 1
+                self.score_value += 100
+                if self.score_value >= self.highscore:
+                    self.highscore = self.score_value
+
+    # same volume for the music and every sound effect bus
+    def set_volume(self, volume):
+        self.music.set_volume(volume)
+        self.sounds.set_volume(volume)
+
+    # swap every live block and the paddle to another theme
+    def change_theme(self, theme):
+        start = time.perf_counter()
+        self.surfacemaker.change_surf(theme)
+        for block in self.block_sprites:
+            block.change_theme()
+        self.board.rebuild(self.block_sprites)
+        self.next_level.change_theme()
+        self.player.change_theme()
+        self.theme_switch_time = time.perf_counter() - start
 
     # UI enhancement for displaying score, level, highscore more clearly
     def overlay(self):
-        overlay_height = 40
-        overlay = pygame.Surface((WINDOW_WIDTH, overlay_height), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        self.display_surface.blit(overlay, (0, 0))
+        self.draw(self.overlay_surf, (0, 0))
 
     # UI element
     def dim_background(self):
@@ -330,200 +359,317 @@ class Game:
         dim_surface.fill((0, 0, 0))
         self.display_surface.blit(dim_surface, (0, 0))
 
-    # UI for the main menu
-    def display_menu(self):
-        menu_width = self.start_menu.get_width()
-        menu_height = self.start_menu.get_height()
-        menu_x = (WINDOW_WIDTH - menu_width) // 2
-        menu_y = (WINDOW_HEIGHT - menu_height) // 3
-
-        self.display_surface.blit(self.start_menu, (menu_x, menu_y))
-        current_surface = self.display_surface.copy()
-        menu_positions = [(440, 320), (440, 360), (440, 400)]
-
-        cursor = Cursor(self.cursor, menu_positions)
-
-        while True:
-            selected_mode = cursor.handle_input()
-            if selected_mode is not None:
-                self.current_mode = self.game_mode[selected_mode]
-                if self.current_mode == "START":
-                    if self.started:
-                        self.ball.active = True
-                    self.started = True
-                return
-
-            self.display_surface.blit(current_surface, (0, 0))
-            cursor.draw(self.display_surface)
-            self.crt.draw()
-            pygame.display.update()
-
-    # game over logic with highscore saving
-    def game_over(self):
-
-        # Update high score text file if current score exceeds it
-        if self.score_value >= self.highscore:
-            self.save_highscore(self.score_value)
-
-        while self.current_mode == "GAME OVER":
-
-            self.display_surface.fill((0, 0, 0))  # Clear the screen with black
-
-            game_over_text = self.game_over_font.render("GAME OVER", True, (255, 0, 0))
-            score_text = self.secondary_font.render(f"Final Score: {self.score_value}", True, (255, 255, 255))
-            high_score_text = self.secondary_font.render(f"High Score: {self.highscore}", True, (255, 255, 0))
-            play_again_text = self.secondary_font.render("Press R to Play Again", True, (255, 255, 255))
-            quit_text = self.secondary_font.render("Press Q to Quit", True, (255, 255, 255))
-            self.display_surface.blit(game_over_text,
-                                      (WINDOW_WIDTH // 2 - game_over_text.get_width() // 2, WINDOW_HEIGHT // 2 - 150))
-            self.display_surface.blit(score_text,
-                                      (WINDOW_WIDTH // 2 - score_text.get_width() // 2, WINDOW_HEIGHT // 2 - 50))
-            self.display_surface.blit(high_score_text,
-                                      (WINDOW_WIDTH // 2 - high_score_text.get_width() // 2, WINDOW_HEIGHT // 2 + 50))
-            self.display_surface.blit(play_again_text,
-                                      (WINDOW_WIDTH // 2 - play_again_text.get_width() // 2, WINDOW_HEIGHT // 2 + 150))
-            self.display_surface.blit(quit_text,
-                                      (WINDOW_WIDTH // 2 - quit_text.get_width() // 2, WINDOW_HEIGHT // 2 + 200))
-            pygame.display.flip()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.KEYDOWN:
-                    if event.type == pygame.KEYDOWN and event.key == pygame.K_r:  # Restart the game
-                        self.score_value = 0
-                        self.projectilekills = 0
-                        self.level = 0
-                        self.reset_level()
-                        self.current_mode = "START"
-                    elif event.key == pygame.K_q:
-                        pygame.quit()
-                        sys.exit()
-
-    # main game logic
+    # offset of a sprite between its previous and current step
+    def interpolation_offset(self, sprite, alpha):
+        previous = self.previous_positions.get(sprite)
+        if previous is None:
+            return 0, 0
+        x = round((previous[0] - sprite.rect.x) * (1 - alpha))
+        y = round((previous[1] - sprite.rect.y) * (1 - alpha))
+        return x, y
+
+    def draw_sprites(self, alpha):
+        for sprite in self.all_sprites:
+            self.draw(sprite.image, sprite.rect.move(self.interpolation_offset(sprite, alpha)))
+        for pos in self.balls.positions(alpha):
+            self.draw(self.balls.image, pos)
+        offset = self.interpolation_offset(self.player, alpha)
+        for laser_rect in self.player.laser_rects:
+            self.draw(self.player.laser_surf, laser_rect.move(offset))
+
+    # queue a surface for this frame's render
+    def draw(self, surf, pos):
+        if self.screen.scale != 1:
+            surf, pos = self.screen.image(surf), self.screen.point(pos)
+        self.draw_items.append((surf, surf.get_rect(topleft=(pos[0], pos[1]))))
+
+    # redraw the whole window
+    def render_full(self):
+        self.display_surface.blit(self.board.surface, (0, 0))
+        self.display_surface.blits(self.draw_items, doreturn=False)
+        self.profiler.lap('draw')
+        # dirty frames only touch part of the window, so they cannot flicker; the full redraw they start from must not either
+        self.crt.draw(steady=self.dirty_rendering and self.started)
+        self.profiler.lap('crt')
+        self.previous_items = None
+        return None
+
+    # redraw only where something appeared, moved, changed or disappeared since the last frame
+    def render_dirty(self, board_changes):
+        if self.previous_items is None:
+            self.render_full()
+            self.previous_items = {(surf, tuple(rect)) for surf, rect in self.draw_items}
+            return None
+
+        current_items = {(surf, tuple(rect)) for surf, rect in self.draw_items}
+        changed = [pygame.Rect(rect) for surf, rect in current_items ^ self.previous_items] + board_changes
+        self.previous_items = current_items
+
+        screen_rect = self.display_surface.get_rect()
+        dirty_rects = [rect.clip(screen_rect) for rect in merge_rects(changed)]
+        dirty_rects = [rect for rect in dirty_rects if rect.width and rect.height]
+
+        item_rects = [rect for surf, rect in self.draw_items]
+        for dirty_rect in dirty_rects:
+            self.display_surface.set_clip(dirty_rect)
+            self.display_surface.blit(self.board.surface, dirty_rect, dirty_rect)
+            for index in dirty_rect.collidelistall(item_rects):
+                self.display_surface.blit(*self.draw_items[index])
+        self.display_surface.set_clip(None)
+        self.profiler.lap('draw')
+        self.crt.draw(dirty_rects, steady=True)
+        self.profiler.lap('crt')
+        return dirty_rects
+
+    # gameplay input
+    def handle_play_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE:
+                self.inputs |= INPUT_FIRE
+            if event.key == pygame.K_RETURN:
+                self.push_scene(MenuScene(self))
+            if event.key == PROFILER_KEY:
+                self.profiler.toggle()
+
+    # update the game in fixed steps, a long frame only catches up a few of them
+    def update_play(self, dt):
+        self.accumulator += min(dt, FIXED_TIMESTEP * MAX_FRAME_STEPS)
+        while self.accumulator >= FIXED_TIMESTEP:
+            self.tick(self.read_input())
+            self.accumulator -= FIXED_TIMESTEP
+
+    # held keys plus the presses since the last step, as INPUT_* bits
+    def read_input(self):
+        inputs = self.inputs
+        self.inputs = 0
+        keys = pygame.key.get_pressed()
+        if keys[pygame.K_RIGHT]:
+            inputs |= INPUT_RIGHT
+        if keys[pygame.K_LEFT]:
+            inputs |= INPUT_LEFT
+        return inputs
+
+    # one fixed step, replays call this directly with the recorded inputs
+    def tick(self, inputs):
+        if self.recorder:
+            self.recorder.record(self, inputs)
+
+        if inputs & (INPUT_FIRE | INPUT_LAUNCH):
+            self.balls.active = True
+        if inputs & INPUT_FIRE and self.can_shoot:
+            self.create_projectile()
+            self.can_shoot = False
+            self.shoot_tick = self.ticks
+        self.player.input(inputs)
+
+        self.previous_positions = {sprite: sprite.rect.topleft for sprite in self.all_sprites}
+        self.all_sprites.update(FIXED_TIMESTEP)
+        self.balls.update(FIXED_TIMESTEP)
+        self.profiler.lap('update')
+        self.upgrade_collision()
+        self.profiler.lap('upgrade collision')
+        self.laser_timer()
+        self.projectile_block_collision()
+        self.profiler.lap('projectile collision')
+        self.check_level_complete()
+        self.ticks += 1
+        self.profiler.lap('level check')
+
+    # draw the frame between the last two steps and return the regions to update
+    def draw_play(self):
+        self.draw_items = []
+        board_changes = self.board.update()
+        self.draw_sprites(self.accumulator / FIXED_TIMESTEP)
+        self.profiler.lap('draw')
+        self.overlay()
+        self.display_hearts()
+        self.score_update()
+        if self.profiler.visible:
+            self.display_profiler()
+        self.profiler.lap('hud')
+
+        # crt styling, only the changed regions when enabled
+        if self.dirty_rendering and self.started:
+            return self.render_dirty(board_changes)
+        return self.render_full()
+
+    # one frame with the pending events, for headless runs; it goes through the scenes like run does
     def play(self, dt):
-
-        if self.player.hearts > 0 and self.current_mode != "PAUSE":
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE:
-                        self.ball.active = True
-                        if self.can_shoot:
-                            self.create_projectile()
-                            self.can_shoot = False
-                            self.shoot_time = pygame.time.get_ticks()
-                    if event.key == pygame.K_RETURN:
-                        self.current_mode = "PAUSE"
-                        return
-
-            # draw bg
-            self.display_surface.blit(self.bg, (0, 0))
-
-            # update the game
-            self.all_sprites.update(dt)
-            self.upgrade_collision()
-            self.laser_timer()
-            self.projectile_block_collision()
-            self.check_level_complete()
-
-            # draw the frame
-            self.all_sprites.draw(self.display_surface)
-            self.overlay()
-            self.display_hearts()
-            self.score_update()
-
-            # crt styling
-            self.crt.draw()
-
-            if not self.started:
-                self.dim_background()
-                self.display_menu()
-
-            pygame.display.update()
-        else:
-            self.current_mode = "GAME OVER"
-
-    # main loop
+        self.frame(pygame.event.get(), dt)
+
+    # fps and the slowest phases under the score bar
+    def display_profiler(self):
+        for index, line in enumerate(self.profiler.lines()):
+            surf = self.text.label(('profiler', index), self.profiler_font, line, (0, 255, 0))
+            self.draw(surf, (20, 50 + index * 22))
+
+    def push_scene(self, scene):
+        self.scenes.append(scene)
+
+    def pop_scene(self):
+        self.scenes.pop()
+        self.scenes[-1].resume()
+
+    # back to level one after a game over
+    def restart(self):
+        self.new_game()
+
+    def quit(self):
+        self.save_recording()
+        self.scores.close()
+        if self.profiler.frames:
+            self.profiler.save(assets.path(PROFILER_EXPORT))
+        pygame.quit()
+        sys.exit()
+
+    # main loop, the scene on top of the stack gets the events and the frame
     def run(self):
         last_time = time.time()
+        last_scene = None
 
         while True:
-            dt = time.time() - last_time
-            if self.current_mode == "START":
-                last_time = time.time()
-                self.play(dt)
-            elif self.current_mode == "GAME OVER":
-                self.game_over()
-            elif self.current_mode == "OPTIONS":
-                self.display_options()
-                last_time = time.time()
-            elif self.current_mode == "PAUSE":
-                self.display_menu()
-                last_time = time.time()
-            elif self.current_mode == "QUIT":
-                pygame.quit()
-                sys.exit()
-
-
-# selection cursor and logic
-class Cursor:
-    def __init__(self, images, positions):
-        self.image = images
-        self.positions = positions
-        self.current_index = 0
-
-    def move_up(self):
-        if self.current_index > 0:
-            self.current_index -= 1
-
-    def move_down(self):
-        if self.current_index < len(self.positions) - 1:
-            self.current_index += 1
-
-    def get_position(self):
-        return self.positions[self.current_index]
-
-    def draw(self, surface):
-        surface.blit(self.image, self.get_position())
-
-    def handle_input(self):
-        for event in pygame.event.get():
+            scene = self.scenes[-1]
+
+            # idle scenes sleep until input arrives, waking now and then for the crt flicker
+            if scene.idle and scene is last_scene:
+                events = [pygame.event.wait(IDLE_TIMEOUT)] + pygame.event.get()
+            else:
+                events = pygame.event.get()
+
+            # a scene that just came to the top starts without a time jump
+            now = time.time()
+            dt = now - last_time if scene is last_scene else 0
+            last_time = now
+            last_scene = scene
+
+            self.frame(events, dt)
+            self.clock.tick(FPS)
+
+    # the scene on top of the stack gets the events, the update and the draw
+    def frame(self, events, dt):
+        scene = self.scenes[-1]
+        self.profiler.begin()
+        for event in events:
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_DOWN:
-                    self.move_down()
-                elif event.key == pygame.K_UP:
-                    self.move_up()
-                if event.key == pygame.K_RETURN:
-                    return self.current_index
+                self.quit()
+            self.music.handle_event(event)
+            self.scenes[-1].handle_event(event)
+        self.profiler.lap('events')
+
+        self.sounds.end_frame()
+        if self.scenes[-1] is scene:
+            scene.update(dt)
+        if self.scenes[-1] is scene:
+            scene.draw()
+            if self.startup.first_frame is None:
+                self.startup.frame_shown()
+                self.warm_up()
+        self.profiler.end_frame()
+
+
+# combine overlapping rects so no region is drawn twice
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
 
 
 # UI enhancement for retro-vibe
 class CRT:
-    def __init__(self):
-        vignette = pygame.image.load('../graphics/background/tv.png').convert_alpha()
-        self.scaled_vignette = pygame.transform.scale(vignette, (WINDOW_WIDTH, WINDOW_HEIGHT))
-        self.display_surface = pygame.display.get_surface()
-        self.create_crt_lines()
-
-    def create_crt_lines(self):
-        line_height = 4
-        line_amount = WINDOW_HEIGHT // line_height
+    def __init__(self, screen, quality=CRT_QUALITY):
+        # own random numbers, so the overlay never shifts the game's seeded sequence
+        self.random = random.Random()
+        vignette = assets.image('graphics/background/tv.png')
+        self.display_surface = screen.surface
+        self.scaled_vignette = pygame.transform.scale(vignette, screen.size)
+        self.create_crt_lines(screen.scale)
+
+        # overlays with their opacity baked into the pixels, cycled by index
+        self.alphas = []
+        self.frames = []
+        self.frame_index = 0
+        self.set_quality(quality)
+
+    def create_crt_lines(self, scale=1):
+        width, height = self.scaled_vignette.get_size()
+        line_height = max(2, round(4 * scale))
+        line_amount = height // line_height
         for line in range(line_amount):
             y = line * line_height
-            pygame.draw.line(self.scaled_vignette, (20, 20, 20), (0, y), (WINDOW_WIDTH, y), 1)
+            pygame.draw.line(self.scaled_vignette, (20, 20, 20), (0, y), (width, y), 1)
+
+    def bake(self, alpha):
+        frame = self.scaled_vignette.copy()
+        frame.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        return frame
+
+    # off, static (one overlay) or flicker (a few overlays with different opacity)
+    def set_quality(self, quality):
+        self.quality = quality
+        self.frame_index = 0
+        if quality == 'off':
+            self.alphas = []
+        elif quality == 'static':
+            self.alphas = [67]
+        elif quality == 'flicker':
+            self.alphas = [self.random.randint(60, 75) for _ in range(CRT_FLICKER_FRAMES)]
+        else:
+            raise ValueError(f'unknown CRT quality: {quality}')
+
+        # each overlay is baked the first time it is shown
+        self.frames = [None] * len(self.alphas)
+
+    # steady keeps the first overlay, for redraws that leave the rest of the window as it was
+    def draw(self, rects=None, steady=False):
+        if not self.frames:
+            return
+        index = 0 if steady else self.frame_index
+        frame = self.frames[index]
+        if frame is None:
+            frame = self.frames[index] = self.bake(self.alphas[index])
+        if not steady:
+            self.frame_index = (self.frame_index + 1) % len(self.frames)
+        if rects is None:
+            self.display_surface.blit(frame, (0, 0))
+        else:
+            for rect in rects:
+                self.display_surface.blit(frame, rect, rect)
+
 
-    def draw(self):
-        self.scaled_vignette.set_alpha(randint(60, 75))
-        self.display_surface.blit(self.scaled_vignette, (0, 0))
+# '1920x1080' from the command line
+def window_size(text):
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected WIDTHxHEIGHT, got {text!r}')
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f'window size has to be positive, got {text!r}')
+    return width, height
+
+
+# a fraction of the layout size, more than 1 would only draw pixels the window throws away
+def render_scale(text):
+    try:
+        scale = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected a number, got {text!r}')
+    if not 0 < scale <= 1:
+        raise argparse.ArgumentTypeError(f'render scale has to be above 0 and at most 1, got {text!r}')
+    return scale
 
 
 if __name__ == '__main__':
-    game = Game()
+    parser = argparse.ArgumentParser(description='Block Buster')
+    parser.add_argument('--render-scale', type=render_scale, default=RENDER_SCALE,
+                        help='frame resolution as a fraction of the layout, 0.5 draws a quarter of the pixels')
+    parser.add_argument('--window', type=window_size, default=WINDOW_SIZE, help='window size, e.g. 1920x1080')
+    args = parser.parse_args()
+
+    game = Game(render_scale=args.render_scale, window_size=args.window)
     game.run()
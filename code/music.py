@@ -0,0 +1,38 @@
+import pygame
+from assets import assets
+
+# posted by the mixer whenever a track finishes
+MUSIC_END = pygame.USEREVENT + 1
+
+
+# streams background music from disk instead of decoding it into a Sound
+class MusicPlayer:
+    def __init__(self, tracks, volume=0.1):
+        self.tracks = tracks
+        self.index = 0
+        self.volume = volume
+
+    def play(self):
+        pygame.mixer.music.load(assets.path(self.tracks[self.index]))
+        pygame.mixer.music.set_volume(self.volume)
+        if len(self.tracks) == 1:
+            pygame.mixer.music.play(loops=-1)
+        else:
+            pygame.mixer.music.set_endevent(MUSIC_END)
+            pygame.mixer.music.play()
+            self.queue_next()
+
+    # the mixer starts the queued track without a gap
+    def queue_next(self):
+        next_track = self.tracks[(self.index + 1) % len(self.tracks)]
+        pygame.mixer.music.queue(assets.path(next_track))
+
+    def handle_event(self, event):
+        if event.type == MUSIC_END:
+            self.index = (self.index + 1) % len(self.tracks)
+            self.queue_next()
+
+    # music has its own volume bus
+    def set_volume(self, volume):
+        self.volume = volume
+        pygame.mixer.music.set_volume(volume)
@@ -0,0 +1,107 @@
+import pygame, json, time
+from collections import deque
+from settings import *
+
+PROFILER_KEY = pygame.K_F3
+
+# upper bounds of the histogram buckets, in ms
+HISTOGRAM_EDGES = [0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, float('inf')]
+
+
+# time spent in each phase of the last few hundred frames
+class FrameProfiler:
+    def __init__(self, enabled=PROFILER_ENABLED, window=PROFILER_WINDOW):
+        # when not collecting every call returns straight away
+        self.always = enabled
+        self.enabled = enabled
+        self.visible = False
+
+        self.samples = {}
+        self.intervals = deque(maxlen=window)
+        self.window = window
+        self.frames = 0
+
+        self.current = {}
+        self.frame_start = self.last = self.last_end = None
+        self.overlay_lines = []
+
+    # the hotkey shows the overlay and collects while it is shown
+    def toggle(self):
+        self.visible = not self.visible
+        self.enabled = self.always or self.visible
+        self.begin()
+
+    def begin(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last = time.perf_counter()
+        self.current = {}
+
+    # time since the previous lap goes to phase
+    def lap(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0) + now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current['frame'] = now - self.frame_start
+
+        # a phase that did not run this frame took no time
+        for phase in self.samples.keys() | self.current.keys():
+            if phase not in self.samples:
+                self.samples[phase] = deque(maxlen=self.window)
+            self.samples[phase].append(self.current.get(phase, 0) * 1000)
+
+        if self.last_end is not None:
+            self.intervals.append(now - self.last_end)
+        self.last_end = now
+        self.frames += 1
+
+    def fps(self):
+        return len(self.intervals) / sum(self.intervals) if self.intervals else 0
+
+    def stats(self, phase):
+        ordered = sorted(self.samples[phase])
+        histogram = [0] * len(HISTOGRAM_EDGES)
+        bucket = 0
+        for value in ordered:
+            while value > HISTOGRAM_EDGES[bucket]:
+                bucket += 1
+            histogram[bucket] += 1
+        return {
+            'mean_ms': sum(ordered) / len(ordered),
+            'p50_ms': ordered[len(ordered) // 2],
+            'p99_ms': ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)],
+            'max_ms': ordered[-1],
+            'histogram': {str(edge): count for edge, count in zip(HISTOGRAM_EDGES, histogram)},
+        }
+
+    def report(self):
+        return {
+            'frames': self.frames,
+            'fps': self.fps(),
+            'phases': {phase: self.stats(phase) for phase in self.samples},
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    # fps and the most expensive phases, worked out again twice a second
+    def lines(self):
+        if self.frames % 30 == 0 or not self.overlay_lines:
+            phases = [phase for phase in self.samples if phase != 'frame']
+            stats = {phase: self.stats(phase) for phase in phases}
+            top = sorted(phases, key=lambda phase: stats[phase]['p50_ms'], reverse=True)[:PROFILER_TOP]
+
+            self.overlay_lines = [f"FPS {self.fps():.0f}"]
+            if 'frame' in self.samples:
+                self.overlay_lines[0] += f"  frame {self.stats('frame')['p50_ms']:.2f} ms"
+            for phase in top:
+                self.overlay_lines.append(f"{phase} {stats[phase]['p50_ms']:.2f} / {stats[phase]['p99_ms']:.2f} ms")
+        return self.overlay_lines
@@ -0,0 +1,110 @@
+import os, struct, sys, time, zlib
+from settings import *
+
+# file layout: header, input runs, then one state checksum every interval ticks
+MAGIC = b'BBREC001'
+HEADER = struct.Struct('<8sQdII')  # magic, seed, timestep, ticks, checksum interval
+RUN = struct.Struct('<HB')  # ticks, INPUT_* bits held for all of them
+
+
+# everything the simulation decides, packed and hashed
+def checksum(game):
+    player, balls = game.player, game.balls
+    values = [game.ticks, game.score_value, game.level, player.hearts, player.speed, player.laser_amount,
+              player.pos.x, player.rect.width, len(balls), balls.active, balls.speed,
+              *balls.pos.ravel(), *balls.direction.ravel()]
+    for group in (game.block_sprites, game.upgrade_sprites, game.projectile_sprites):
+        values.append(len(group))
+        for sprite in group:
+            values += [*sprite.rect, getattr(sprite, 'health', 0)]
+    return zlib.crc32(struct.pack(f'<{len(values)}d', *values))
+
+
+# input of every fixed step of one game, from its seed on
+class Recorder:
+    def __init__(self, seed, interval=REPLAY_CHECKSUM_INTERVAL):
+        self.seed = seed
+        self.interval = interval
+        self.runs = []
+        self.checksums = []
+        self.ticks = 0
+
+    # called before the tick runs
+    def record(self, game, inputs):
+        if self.ticks % self.interval == 0:
+            self.checksums.append(checksum(game))
+
+        # held keys rarely change, so store how long each input lasted
+        if self.runs and self.runs[-1][1] == inputs and self.runs[-1][0] < 0xFFFF:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, inputs])
+        self.ticks += 1
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.seed, FIXED_TIMESTEP, self.ticks, self.interval))
+            f.write(struct.pack('<I', len(self.runs)))
+            for count, inputs in self.runs:
+                f.write(RUN.pack(count, inputs))
+            f.write(struct.pack(f'<{len(self.checksums)}I', *self.checksums))
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, seed, timestep, ticks, interval = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f'{path} is not a replay')
+    offset = HEADER.size
+    run_count, = struct.unpack_from('<I', data, offset)
+    offset += 4
+    runs = [RUN.unpack_from(data, offset + i * RUN.size) for i in range(run_count)]
+    offset += run_count * RUN.size
+    checksums = struct.unpack_from(f'<{(len(data) - offset) // 4}I', data, offset)
+    return {'seed': seed, 'timestep': timestep, 'ticks': ticks, 'interval': interval,
+            'runs': runs, 'checksums': checksums}
+
+
+# run a recorded game again without drawing, as fast as it goes
+def replay(path):
+    from main import Game
+
+    log = load(path)
+    if log['timestep'] != FIXED_TIMESTEP:
+        raise ValueError(f"recorded at a {log['timestep']} s step, the game runs at {FIXED_TIMESTEP} s")
+
+    game = Game(seed=log['seed'], scores=':memory:')
+    game.recorder = None
+    game.started = True
+
+    start = time.perf_counter()
+    mismatch = None
+    checked = 0
+    for count, inputs in log['runs']:
+        for _ in range(count):
+            if game.ticks % log['interval'] == 0:
+                if checksum(game) != log['checksums'][game.ticks // log['interval']]:
+                    mismatch = game.ticks
+                    break
+                checked += 1
+            game.tick(inputs)
+        if mismatch is not None:
+            break
+
+    return {'ticks': game.ticks, 'checked': checked, 'mismatch': mismatch,
+            'seconds': time.perf_counter() - start, 'score': game.score_value, 'level': game.level}
+
+
+if __name__ == '__main__':
+    # no window or sound card needed
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    result = replay(sys.argv[1])
+    print(f"{result['ticks']} ticks in {result['seconds']:.2f} s, "
+          f"{result['checked']} checksums matched, score {result['score']} level {result['level']}")
+    if result['mismatch'] is not None:
+        print(f"state diverged before tick {result['mismatch']}")
+        sys.exit(1)
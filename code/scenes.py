@@ -0,0 +1,276 @@
+import pygame
+from settings import *
+
+
+# selection cursor and logic
+class Cursor:
+    def __init__(self, images, positions):
+        self.image = images
+        self.positions = positions
+        self.current_index = 0
+
+    def move_up(self):
+        if self.current_index > 0:
+            self.current_index -= 1
+
+    def move_down(self):
+        if self.current_index < len(self.positions) - 1:
+            self.current_index += 1
+
+    def get_position(self):
+        return self.positions[self.current_index]
+
+    def draw(self, screen):
+        screen.blit(self.image, self.get_position())
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_DOWN:
+                self.move_down()
+            elif event.key == pygame.K_UP:
+                self.move_up()
+            if event.key == pygame.K_RETURN:
+                return self.current_index
+
+
+# one screen on the game's scene stack, only the top scene runs
+class Scene:
+    # idle scenes wait for input instead of redrawing unchanged frames
+    idle = False
+
+    def __init__(self, game):
+        self.game = game
+        # layout coordinates go through the screen, the frame behind it may be any size
+        self.screen = game.screen
+        self.display_surface = game.display_surface
+
+    # called when the scene above this one is popped
+    def resume(self):
+        pass
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt):
+        pass
+
+    def draw(self):
+        pass
+
+
+# main game logic
+class GameplayScene(Scene):
+    def resume(self):
+        # menus drew over the game, so the next frame starts from a full redraw
+        self.game.previous_items = None
+
+    def handle_event(self, event):
+        self.game.handle_play_event(event)
+
+    def update(self, dt):
+        if self.game.player.hearts <= 0:
+            self.game.push_scene(GameOverScene(self.game))
+            return
+        self.game.update_play(dt)
+
+    def draw(self):
+        self.game.screen.present(self.game.draw_play())
+        self.game.profiler.lap('display')
+
+        # the frame is out, some of the spare time goes to the next level
+        self.game.next_level.step()
+        self.game.profiler.lap('prebuild')
+
+        # before the first start the main menu sits on top of the board
+        if not self.game.started:
+            self.game.push_scene(MenuScene(self.game, dim=True))
+
+
+# UI for the main menu
+class MenuScene(Scene):
+    idle = True
+
+    def __init__(self, game, dim=False):
+        super().__init__(game)
+        if dim:
+            game.dim_background()
+
+        menu_width = game.start_menu.get_width()
+        menu_height = game.start_menu.get_height()
+        menu_x = (WINDOW_WIDTH - menu_width) // 2
+        menu_y = (WINDOW_HEIGHT - menu_height) // 3
+
+        self.screen.blit(game.start_menu, (menu_x, menu_y))
+        self.background = self.display_surface.copy()
+        self.cursor = Cursor(game.cursor, [(440, 320), (440, 360), (440, 400)])
+
+    def handle_event(self, event):
+        selected_mode = self.cursor.handle_event(event)
+        if selected_mode is None:
+            return
+
+        mode = self.game.game_mode[selected_mode]
+        if mode == "START":
+            if self.game.started:
+                self.game.inputs |= INPUT_LAUNCH
+            self.game.started = True
+            self.game.pop_scene()
+        elif mode == "OPTIONS":
+            self.game.pop_scene()
+            self.game.push_scene(OptionsScene(self.game))
+        elif mode == "QUIT":
+            self.game.quit()
+
+    def draw(self):
+        self.display_surface.blit(self.background, (0, 0))
+        self.cursor.draw(self.screen)
+        self.game.crt.draw()
+        self.screen.present()
+
+
+# UI for options
+class OptionsScene(Scene):
+    idle = True
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.screen.blit(game.options_bg, (0, 0))
+        self.screen.blit(game.options_header, (WINDOW_WIDTH // 2 + 100, WINDOW_HEIGHT // 14))
+        self.screen.blit(game.option_theme, (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 4))
+        self.screen.blit(game.option_volume, (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 4 + 80))
+        self.screen.blit(game.option_credits, (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 4 + 160))
+        self.screen.blit(game.back_button, (WINDOW_WIDTH // 24, WINDOW_HEIGHT // 10))
+        game.crt.draw()
+
+        self.background = self.display_surface.copy()
+        self.cursor = Cursor(game.cursor, [(610, 250), (610, 330), (610, 410), (55, 115)])
+
+    def handle_event(self, event):
+        selected_option = self.cursor.handle_event(event)
+        if selected_option is None:
+            return
+
+        selection = self.game.setting_options[selected_option]
+        if selection == "VOLUME":
+            self.game.push_scene(VolumeScene(self.game, self.background))
+        if selection == "THEME":
+            self.game.push_scene(ThemeScene(self.game, self.background))
+        if selection == "CREDITS":
+            self.game.push_scene(CreditsScene(self.game))
+        if selection == "BACK":
+            self.game.pop_scene()
+
+    def draw(self):
+        self.display_surface.blit(self.background, (0, 0))
+        self.cursor.draw(self.screen)
+        self.screen.present()
+
+
+# UI for volume adjustment
+class VolumeScene(Scene):
+    idle = True
+
+    def __init__(self, game, background):
+        super().__init__(game)
+        self.background = background
+        volume_position = [(950, 320), (990, 320), (1030, 320), (1070, 320), (1100, 320)]
+        self.cursor = Cursor(game.volume_cursor, volume_position)
+
+    def handle_event(self, event):
+        volume = self.cursor.handle_event(event)
+        if volume is not None:
+            self.game.set_volume(volume * 0.25)
+            self.game.pop_scene()
+
+    def draw(self):
+        self.display_surface.blit(self.background, (0, 0))
+        self.display_surface.fill((255, 117, 0), self.screen.rect((950, 320, 160, 32)))
+        self.cursor.draw(self.screen)
+        self.screen.present()
+
+
+# UI for theme adjustment
+class ThemeScene(Scene):
+    idle = True
+
+    def __init__(self, game, background):
+        super().__init__(game)
+        self.background = background
+        self.cursor = Cursor(game.cursor, [(950, 230), (950, 270)])
+
+    def handle_event(self, event):
+        theme_selection = self.cursor.handle_event(event)
+        if theme_selection == 0:
+            self.game.change_theme("theme1")
+            self.game.current_theme = "90s"
+            self.game.pop_scene()
+        elif theme_selection == 1:
+            self.game.change_theme("theme2")
+            self.game.current_theme = "80s"
+            self.game.pop_scene()
+
+    def draw(self):
+        self.display_surface.blit(self.background, (0, 0))
+        self.screen.blit(self.game.theme90s, (1050, 220))
+        self.screen.blit(self.game.theme80s, (1050, 260))
+        self.cursor.draw(self.screen)
+        self.screen.present()
+
+
+# frame for team credit
+class CreditsScene(Scene):
+    idle = True
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.cursor = Cursor(game.cursor, [(50, 50)])
+
+    def handle_event(self, event):
+        if self.cursor.handle_event(event) is not None:
+            self.game.pop_scene()
+
+    def draw(self):
+        self.screen.blit(self.game.credit_bg, (0, 0))
+        self.cursor.draw(self.screen)
+        self.screen.present()
+
+
+# game over logic with highscore saving
+class GameOverScene(Scene):
+    idle = True
+
+    def __init__(self, game):
+        super().__init__(game)
+
+        # every game goes on the leaderboard, the disk write happens off the main thread
+        game.scores.add(game.score_value, game.level, game.seed)
+        game.save_recording()
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r:  # Restart the game
+                self.game.restart()
+                self.game.pop_scene()
+            elif event.key == pygame.K_q:
+                self.game.quit()
+
+    def draw(self):
+        game = self.game
+        self.display_surface.fill((0, 0, 0))  # Clear the screen with black
+
+        game_over_text = game.text.label('game over', game.game_over_font, "GAME OVER", (255, 0, 0))
+        score_text = game.text.number('final score', game.secondary_font, "Final Score: ", game.score_value, (255, 255, 255))
+        high_score_text = game.text.number('game over highscore', game.secondary_font, "High Score: ", game.highscore, (255, 255, 0))
+        play_again_text = game.text.label('play again', game.secondary_font, "Press R to Play Again", (255, 255, 255))
+        quit_text = game.text.label('quit', game.secondary_font, "Press Q to Quit", (255, 255, 255))
+        self.screen.blit(game_over_text,
+                         (WINDOW_WIDTH // 2 - game_over_text.get_width() // 2, WINDOW_HEIGHT // 2 - 150))
+        self.screen.blit(score_text,
+                         (WINDOW_WIDTH // 2 - score_text.get_width() // 2, WINDOW_HEIGHT // 2 - 50))
+        self.screen.blit(high_score_text,
+                         (WINDOW_WIDTH // 2 - high_score_text.get_width() // 2, WINDOW_HEIGHT // 2 + 50))
+        self.screen.blit(play_again_text,
+                         (WINDOW_WIDTH // 2 - play_again_text.get_width() // 2, WINDOW_HEIGHT // 2 + 150))
+        self.screen.blit(quit_text,
+                         (WINDOW_WIDTH // 2 - quit_text.get_width() // 2, WINDOW_HEIGHT // 2 + 200))
+        self.screen.present()
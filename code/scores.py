@@ -0,0 +1,130 @@
+import os, sqlite3, time
+from concurrent.futures import ThreadPoolExecutor
+from settings import *
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    level INTEGER,
+    seed INTEGER,
+    played REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC);
+'''
+
+
+# every finished game, kept in SQLite so a crash mid-write never loses or garbles the earlier ones
+class ScoreStore:
+    def __init__(self, path, size=LEADERBOARD_SIZE, legacy=None):
+        self.path = path
+        self.size = size
+
+        self.written = 0
+        self.failed = 0
+        # a broken file was moved aside, or the file could not be opened and scores only last the session
+        self.recovered = False
+        self.persistent = True
+
+        # the one thread that writes, so a slow disk holds up the writer instead of a frame
+        self.executor = ThreadPoolExecutor(1)
+        self.connection = self.open()
+        if legacy:
+            self.import_legacy(legacy)
+
+        # the best games as (score, level, seed, played), what the game and a leaderboard read
+        self.leaders = self.read(size)
+
+    # a file that is not a database or fails its check is moved aside and the scores start over
+    def open(self):
+        try:
+            return self.connect(self.path)
+        except sqlite3.OperationalError:
+            # locked by another copy of the game or not writable, the file is left alone
+            self.persistent = False
+            return self.connect(':memory:')
+        except sqlite3.DatabaseError:
+            os.replace(self.path, self.corrupt_path())
+            for suffix in ('-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+            self.recovered = True
+            return self.connect(self.path)
+
+    # a name no earlier broken file took, even one moved aside in the same second
+    def corrupt_path(self):
+        stem = f'{self.path}.corrupt-{time.strftime("%Y%m%d-%H%M%S")}'
+        path, number = stem, 1
+        while os.path.exists(path):
+            number += 1
+            path = f'{stem}-{number}'
+        return path
+
+    @staticmethod
+    def connect(path):
+        # handed over to the writer thread after setup, never used by two threads at once
+        connection = sqlite3.connect(path, check_same_thread=False)
+        try:
+            # write ahead log: a commit is all or nothing, and readers never see half of one
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            if connection.execute('PRAGMA quick_check').fetchone()[0] != 'ok':
+                raise sqlite3.DatabaseError('quick_check failed')
+            connection.executescript(SCHEMA)
+        except sqlite3.DatabaseError:
+            connection.close()
+            raise
+        return connection
+
+    # the score of the old highscore file, once, missing or unreadable files are skipped
+    def import_legacy(self, path):
+        if self.connection.execute('SELECT 1 FROM scores LIMIT 1').fetchone():
+            return
+        try:
+            with open(path) as f:
+                score = int(f.read().strip())
+            played = os.path.getmtime(path)
+        except (OSError, ValueError):
+            return
+        if score > 0:
+            with self.connection:
+                self.connection.execute('INSERT INTO scores (score, played) VALUES (?, ?)', (score, played))
+
+    def best(self):
+        return self.leaders[0][0] if self.leaders else 0
+
+    # the kept leaders when they are enough, otherwise read on the writer thread after the queued writes
+    def top(self, count=None):
+        if count is None:
+            count = self.size
+        if count < 0:
+            raise ValueError(f'count has to be 0 or more, got {count}')
+        if count <= self.size:
+            return self.leaders[:count]
+        return self.executor.submit(self.read, count).result()
+
+    def read(self, count):
+        return self.connection.execute(
+            'SELECT score, level, seed, played FROM scores ORDER BY score DESC, id LIMIT ?', (count,)).fetchall()
+
+    # the leaderboard changes now, the row is written in the background
+    def add(self, score, level=None, seed=None):
+        entry = (score, level, seed, time.time())
+        self.leaders.append(entry)
+        self.leaders.sort(key=lambda leader: -leader[0])
+        del self.leaders[self.size:]
+        return self.executor.submit(self.write, entry)
+
+    def write(self, entry):
+        try:
+            with self.connection:
+                self.connection.execute('INSERT INTO scores (score, level, seed, played) VALUES (?, ?, ?, ?)', entry)
+            self.written += 1
+        except sqlite3.Error:
+            # a full or read-only disk costs this one game, not the session
+            self.failed += 1
+
+    # wait for the queued writes, then let go of the file
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.connection.close()
@@ -0,0 +1,64 @@
+import pygame, weakref
+from math import ceil, floor
+from settings import *
+
+
+# the window and the frame the game draws into, everything is laid out in WINDOW_WIDTH x WINDOW_HEIGHT
+# and only turned into frame pixels here, so the layout never depends on the render resolution
+class Screen:
+    def __init__(self, render_scale=RENDER_SCALE, window_size=WINDOW_SIZE):
+        if not 0 < render_scale <= 1:
+            raise ValueError(f'render scale has to be above 0 and at most 1, got {render_scale}')
+        self.scale = render_scale
+        self.size = (round(WINDOW_WIDTH * render_scale), round(WINDOW_HEIGHT * render_scale))
+        self.window = pygame.display.set_mode(window_size or (WINDOW_WIDTH, WINDOW_HEIGHT))
+
+        # a frame the size of the window is the window itself, otherwise it is scaled up or down when shown
+        self.direct = self.size == self.window.get_size()
+        self.surface = self.window if self.direct else pygame.Surface(self.size).convert()
+        self.window_scale = (self.window.get_width() / self.size[0], self.window.get_height() / self.size[1])
+
+        # surfaces at frame scale, dropped together with the original
+        self.images = weakref.WeakKeyDictionary()
+        # layout pixels a frame pixel can reach into
+        self.margin = ceil(2 / render_scale)
+
+    def image(self, surf):
+        if self.scale == 1:
+            return surf
+        scaled = self.images.get(surf)
+        if scaled is None:
+            size = (max(1, round(surf.get_width() * self.scale)), max(1, round(surf.get_height() * self.scale)))
+            scaled = self.images[surf] = pygame.transform.smoothscale(surf, size)
+        return scaled
+
+    def point(self, pos):
+        if self.scale == 1:
+            return pos
+        return round(pos[0] * self.scale), round(pos[1] * self.scale)
+
+    # the frame area a layout rect can touch, a pixel wider on every side when scaled
+    def rect(self, rect):
+        if self.scale == 1:
+            return pygame.Rect(rect)
+        rect = pygame.Rect(rect)
+        left, top = floor(rect.left * self.scale) - 1, floor(rect.top * self.scale) - 1
+        return pygame.Rect(left, top, ceil(rect.right * self.scale) + 1 - left, ceil(rect.bottom * self.scale) + 1 - top)
+
+    def blit(self, surf, pos):
+        self.surface.blit(self.image(surf), self.point(pos))
+
+    # put the frame on the window, rects in frame pixels or None for all of it
+    def present(self, rects=None):
+        if self.direct:
+            pygame.display.update(rects)
+            return
+        if rects == []:
+            return
+        pygame.transform.scale(self.surface, self.window.get_size(), self.window)
+        if rects is None:
+            pygame.display.update()
+        else:
+            sx, sy = self.window_scale
+            pygame.display.update([pygame.Rect(floor(rect.left * sx), floor(rect.top * sy),
+                                               ceil(rect.width * sx) + 1, ceil(rect.height * sy) + 1) for rect in rects])
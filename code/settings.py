@@ -27,4 +27,91 @@ BLOCK_HEIGHT = WINDOW_HEIGHT / len(BLOCK_MAP) - GAP_SIZE
 BLOCK_WIDTH = WINDOW_WIDTH / len(BLOCK_MAP[0]) - GAP_SIZE
 TOP_OFFSET = WINDOW_HEIGHT // 20
 
-UPGRADES = ['speed','laser','heart','size']
+UPGRADES = ['speed','laser','heart','size','multi']
+
+# multi-ball: each ball splits into three, the new ones turned this many degrees
+MAX_BALLS = 512
+MULTI_BALL_ANGLE = 20
+
+# background music playlist, streamed in order
+MUSIC_TRACKS = ['sounds/funmusic.mp3']
+
+# sound effects: file, bus, volume inside the bus, priority (higher may steal lower)
+SOUND_EFFECTS = {
+	'impact': ('sounds/impact.wav', 'ball', 1, 1),
+	'fail': ('sounds/fail.wav', 'alert', 1, 3),
+	'laser': ('sounds/laser.wav', 'laser', 1, 1),
+	'laser hit': ('sounds/laser_hit.wav', 'laser', 0.2, 0),
+	'powerup': ('sounds/powerup.wav', 'pickup', 1, 2),
+}
+
+# reserved mixer channels per bus
+SOUND_BUSES = {'ball': 2, 'laser': 3, 'pickup': 1, 'alert': 1}
+
+# copies of the same effect allowed to start in one frame
+SOUND_FRAME_CAP = 1
+
+SURFACE_CACHE_SIZE = 64
+
+# where the level layouts come from: 'map' (BLOCK_MAP), 'files' (LEVEL_DIR/*.txt) or 'random'
+LEVEL_SOURCE = 'map'
+LEVEL_DIR = 'levels'
+
+# blocks of the next level built after each frame while the current one is played
+LEVEL_PREBUILD_STEPS = 8
+
+# pre-decoded graphics written by bundle.py, relative to the repository root
+ASSET_BUNDLE = 'graphics.bundle'
+
+# threads decoding asset files during startup
+ASSET_WORKERS = 4
+
+# print the time spent in every startup stage once the first frame is shown
+STARTUP_REPORT = False
+
+# input of one fixed step, as bits
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_FIRE = 4
+INPUT_LAUNCH = 8
+
+# frame phase profiler, collecting from the start or only while its overlay is shown (F3)
+PROFILER_ENABLED = False
+PROFILER_WINDOW = 600
+PROFILER_TOP = 5
+PROFILER_EXPORT = 'profile.json'
+
+# recorded games for replay.py, with a state checksum every interval ticks
+RECORD_REPLAYS = False
+REPLAY_DIR = 'replays'
+REPLAY_CHECKSUM_INTERVAL = 120
+
+# every finished game goes into this SQLite file, relative to the repository root; the best few stay in memory
+SCORE_DB = 'scores.db'
+LEADERBOARD_SIZE = 10
+# the old single highscore file, read once into an empty score database
+LEGACY_HIGHSCORE = 'code/highscore.txt'
+
+# simulation runs at a fixed rate independent of the frame rate
+FIXED_TIMESTEP = 1 / 120
+MAX_FRAME_STEPS = 8
+
+# swept ball collision
+MAX_BOUNCES = 4
+SWEEP_EPSILON = 1e-9
+
+# only redraw the regions of the gameplay screen that changed
+DIRTY_RENDERING = False
+
+# frame resolution as a fraction (above 0, at most 1) of WINDOW_WIDTH x WINDOW_HEIGHT, and the window it is scaled to (None for the layout size)
+# both can be set at launch: python main.py --render-scale 0.5 --window 1920x1080
+RENDER_SCALE = 1
+WINDOW_SIZE = None
+
+# frame cap, and how long idle menus sleep between redraws in milliseconds
+FPS = 60
+IDLE_TIMEOUT = 250
+
+# crt effect: 'off', 'static' or 'flicker'
+CRT_QUALITY = 'flicker'
+CRT_FLICKER_FRAMES = 4
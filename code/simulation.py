@@ -0,0 +1,502 @@
+import numpy as np
+from settings import *
+
+# sizes of the sprite images the rules depend on
+PADDLE_WIDTH = WINDOW_WIDTH // 10
+PADDLE_HEIGHT = WINDOW_HEIGHT // 20
+BALL_SIZE = 32
+UPGRADE_SIZE = 64
+LASER_SIZE = (20, 28)
+PROJECTILE_SIZE = (20, 40)
+
+# speeds and timings used by the sprites
+PADDLE_SPEED = 300
+BALL_SPEED = 300
+UPGRADE_SPEED = 300
+PROJECTILE_SPEED = 300
+LASER_COOLDOWN = 0.5
+
+MAX_HEALTH = len(COLOR_LEGEND)
+
+
+def rect_round(value):
+    # pygame rects round float coordinates half away from zero
+    return np.where(value >= 0, np.floor(value + 0.5), np.ceil(value - 0.5)).astype(np.int64)
+
+
+def sweep(start, move, width, height, box):
+    # earliest fraction of move at which each width x height box at start touches its box (left, top, right, bottom),
+    # inf where it does not, and the normal of the sides it arrives on
+    entry, leave = [], []
+    for axis, low, high, size in ((0, box[0], box[2], width), (1, box[1], box[3], height)):
+        position = start[:, axis]
+        step = move[:, axis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            near = np.where(step > 0, (low - (position + size)) / step, (high - position) / step)
+            far = np.where(step > 0, (high - position) / step, (low - (position + size)) / step)
+        overlap = (position + size > low) & (position < high)
+        entry.append(np.where(step == 0, np.where(overlap, -np.inf, np.inf), near))
+        leave.append(np.where(step == 0, np.where(overlap, np.inf, -np.inf), far))
+
+    time = np.maximum(*entry)
+    hit = (time >= 0) & (time <= 1) & (time < np.minimum(*leave))
+    normal = np.stack(entry, axis=1) >= time[:, None] - SWEEP_EPSILON
+    normal = np.where(normal & hit[:, None], -np.sign(move), 0)
+    return np.where(hit, time, np.inf), normal
+
+
+class BatchSimulation:
+    def __init__(self, games, block_map=BLOCK_MAP, dt=FIXED_TIMESTEP, seed=None,
+                 max_upgrades=16, max_projectiles=64):
+        self.games = games
+        self.dt = dt
+        self.rng = np.random.default_rng(seed)
+
+        # block layout shared by every game
+        self.base_health = np.array([[0 if col == ' ' else int(col) for col in row] for row in block_map])
+        self.rows, self.cols = self.base_health.shape
+        self.cell_width = WINDOW_WIDTH / self.cols
+        self.cell_height = WINDOW_HEIGHT / self.rows
+        self.block_width = int(self.cell_width - GAP_SIZE)
+        self.block_height = int(self.cell_height - GAP_SIZE)
+        self.block_left = rect_round(np.arange(self.cols) * self.cell_width + GAP_SIZE // 2)
+        self.block_top = rect_round(TOP_OFFSET + np.arange(self.rows) * self.cell_height + GAP_SIZE // 2)
+
+        # per game state
+        self.health = np.zeros((games, self.rows, self.cols), np.int64)
+        self.level = np.ones(games, np.int64)
+        self.score = np.zeros(games, np.int64)
+        self.projectile_kills = np.zeros(games, np.int64)
+        self.done = np.zeros(games, bool)
+        self.time = np.zeros(games)
+
+        # paddle
+        self.paddle_pos = np.zeros(games)
+        self.paddle_x = np.zeros(games, np.int64)
+        self.paddle_old_x = np.zeros(games, np.int64)
+        self.paddle_width = np.zeros(games, np.int64)
+        self.paddle_top = WINDOW_HEIGHT - 20 - PADDLE_HEIGHT
+        self.paddle_speed = np.zeros(games)
+        self.hearts = np.zeros(games, np.int64)
+        self.laser_amount = np.zeros(games, np.int64)
+
+        # laser positions as last computed by the paddle update
+        self.laser_x = np.zeros(games, np.int64)
+        self.laser_width = np.zeros(games, np.int64)
+        self.laser_count = np.zeros(games, np.int64)
+        self.can_shoot = np.ones(games, bool)
+        self.shoot_time = np.zeros(games)
+
+        # ball
+        self.ball_pos = np.zeros((games, 2))
+        self.ball_x = np.zeros(games, np.int64)
+        self.ball_y = np.zeros(games, np.int64)
+        self.ball_dir = np.zeros((games, 2))
+        self.ball_speed = np.zeros(games)
+        self.ball_active = np.zeros(games, bool)
+
+        # falling upgrades
+        self.upgrade_alive = np.zeros((games, max_upgrades), bool)
+        self.upgrade_type = np.zeros((games, max_upgrades), np.int64)
+        self.upgrade_x = np.zeros((games, max_upgrades), np.int64)
+        self.upgrade_pos = np.zeros((games, max_upgrades))
+        self.upgrade_y = np.zeros((games, max_upgrades), np.int64)
+
+        # projectiles, the serial keeps the order they were fired in
+        self.projectile_alive = np.zeros((games, max_projectiles), bool)
+        self.projectile_x = np.zeros((games, max_projectiles), np.int64)
+        self.projectile_pos = np.zeros((games, max_projectiles))
+        self.projectile_y = np.zeros((games, max_projectiles), np.int64)
+        self.projectile_serial = np.zeros((games, max_projectiles), np.int64)
+        self.next_serial = 0
+
+        self.reset()
+
+    # start every game in the mask from level one
+    def reset(self, mask=None):
+        mask = self.all_games(mask)
+        self.level[mask] = 1
+        self.score[mask] = 0
+        self.projectile_kills[mask] = 0
+        self.done[mask] = False
+        self.time[mask] = 0
+        self.can_shoot[mask] = True
+        self.shoot_time[mask] = 0
+        self.start_level(mask)
+        return self.observe()
+
+    def all_games(self, mask):
+        if mask is None:
+            return np.ones(self.games, bool)
+        return np.asarray(mask, bool)
+
+    # same remapping as levels.level_up, only the 'map' level source is simulated
+    def level_health(self, level):
+        return np.where(self.base_health > 0, np.minimum(self.base_health + level[:, None, None] - 1, MAX_HEALTH), 0)
+
+    # same as Game.reset_level: new blocks, paddle and ball
+    def start_level(self, mask):
+        self.health[mask] = self.level_health(self.level[mask])
+
+        self.paddle_width[mask] = PADDLE_WIDTH
+        self.paddle_x[mask] = WINDOW_WIDTH // 2 - PADDLE_WIDTH // 2
+        self.paddle_old_x[mask] = self.paddle_x[mask]
+        self.paddle_pos[mask] = self.paddle_x[mask]
+        self.paddle_speed[mask] = PADDLE_SPEED
+        self.hearts[mask] = 3
+        self.laser_amount[mask] = 2
+        self.laser_count[mask] = 0
+
+        self.ball_active[mask] = False
+        self.ball_dir[mask, 0] = self.rng.choice((1, -1), int(mask.sum()))
+        self.ball_dir[mask, 1] = -1
+        self.ball_speed[mask] = BALL_SPEED + (self.level[mask] - 1) * 30
+        self.follow_paddle(mask)
+
+        self.upgrade_alive[mask] = False
+        self.projectile_alive[mask] = False
+
+    def follow_paddle(self, mask):
+        self.ball_x[mask] = self.paddle_x[mask] + self.paddle_width[mask] // 2 - BALL_SIZE // 2
+        self.ball_y[mask] = self.paddle_top - BALL_SIZE
+        self.ball_pos[mask, 0] = self.ball_x[mask]
+        self.ball_pos[mask, 1] = self.ball_y[mask]
+
+    def observe(self):
+        return {
+            'blocks': self.health.copy(),
+            'paddle_x': self.paddle_x.copy(),
+            'paddle_width': self.paddle_width.copy(),
+            'ball_x': self.ball_x.copy(),
+            'ball_y': self.ball_y.copy(),
+            'ball_direction': self.ball_dir.copy(),
+            'ball_active': self.ball_active.copy(),
+            'upgrades': np.where(self.upgrade_alive, self.upgrade_type, -1),
+            'hearts': self.hearts.copy(),
+            'level': self.level.copy(),
+            'score': self.score.copy(),
+            'done': self.done.copy(),
+        }
+
+    # advance every running game by one frame
+    # move is -1, 0 or 1 per game and fire presses space
+    def step(self, move, fire):
+        move = np.asarray(move)
+        fire = np.asarray(fire, bool)
+        live = ~self.done
+        start_score = self.score.copy()
+        self.time[live] += self.dt
+
+        # space launches the ball and fires the lasers
+        pressed = fire & live
+        self.ball_active |= pressed
+        self.fire(pressed & self.can_shoot)
+
+        self.update_projectiles(live)
+        self.update_upgrades(live)
+        resting = live & ~self.ball_active
+        self.update_paddle(np.where(live, move, 0), live)
+        self.update_ball(live & self.ball_active)
+        self.follow_paddle(resting)
+
+        self.upgrade_collision(live)
+        self.can_shoot |= live & (self.time - self.shoot_time >= LASER_COOLDOWN - 1e-9)
+        self.projectile_block_collision(live)
+
+        # level complete
+        cleared = live & ~self.health.any(axis=(1, 2))
+        if cleared.any():
+            self.level[cleared] += 1
+            self.start_level(cleared)
+
+        self.done |= self.hearts <= 0
+        return self.observe(), self.score - start_score, self.done.copy()
+
+    def update_paddle(self, move, live):
+        self.paddle_old_x[live] = self.paddle_x[live]
+        self.paddle_pos += move * self.paddle_speed * self.dt
+        self.paddle_x[live] = np.rint(self.paddle_pos[live])
+
+        # screen constraint
+        self.paddle_x = np.clip(self.paddle_x, 0, WINDOW_WIDTH - self.paddle_width)
+        clamped = live & (self.paddle_x != np.rint(self.paddle_pos))
+        self.paddle_pos[clamped] = self.paddle_x[clamped]
+
+        # remember where the lasers sit for the next shot
+        self.laser_x[live] = self.paddle_x[live]
+        self.laser_width[live] = self.paddle_width[live]
+        self.laser_count[live] = self.laser_amount[live]
+
+    def update_ball(self, active):
+        if not active.any():
+            return
+        norm = np.hypot(self.ball_dir[:, 0], self.ball_dir[:, 1])
+        normalize = active & (norm != 0)
+        self.ball_dir[normalize] /= norm[normalize, None]
+
+        # same swept movement as Balls.move
+        distance = self.ball_speed * self.dt
+        elapsed = np.zeros(self.games)
+        paddle_move = self.paddle_x - self.paddle_old_x
+        moving = active.copy()
+        for _ in range(MAX_BOUNCES):
+            if not moving.any():
+                break
+            move = self.ball_dir * (distance * (1 - elapsed))[:, None]
+            paddle_x = self.paddle_old_x + paddle_move * elapsed
+            time, contacts = self.contacts(moving, move, paddle_x, paddle_move * (1 - elapsed))
+
+            free = moving & np.isinf(time)
+            self.ball_pos[free] += move[free]
+            moving &= ~free
+            time = np.where(moving, time, 0)
+            self.ball_pos[moving] += move[moving] * time[moving, None]
+            elapsed += (1 - elapsed) * time
+
+            for contact_time, normal_x, normal_y, solid, block in contacts:
+                hit = moving & (contact_time <= time + SWEEP_EPSILON)
+                for axis, normal in ((0, normal_x), (1, normal_y)):
+                    turn = hit & (normal != 0)
+                    self.ball_dir[turn, axis] = np.abs(self.ball_dir[turn, axis]) * normal[turn]
+                    # keep the same 1px gap the old overlap rules left
+                    if solid:
+                        self.ball_pos[turn, axis] += normal[turn]
+                if block is not None and hit.any():
+                    self.damage_blocks(np.flatnonzero(hit), block[0][hit], block[1][hit])
+
+        self.ball_x[active] = np.rint(self.ball_pos[active, 0])
+        self.ball_y[active] = np.rint(self.ball_pos[active, 1])
+        self.window_collision_horizontal(active)
+        self.window_collision_vertical(active)
+
+    def contacts(self, moving, move, paddle_x, paddle_move):
+        # walls, paddle and blocks along move as (time, normal x, normal y, solid, block cell)
+        contacts = []
+        x, y = self.ball_pos[:, 0], self.ball_pos[:, 1]
+        zero = np.zeros(self.games)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            left = np.where(move[:, 0] < 0, -x / move[:, 0], np.inf)
+            right = np.where(move[:, 0] > 0, (WINDOW_WIDTH - BALL_SIZE - x) / move[:, 0], np.inf)
+            top = np.where(move[:, 1] < 0, -y / move[:, 1], np.inf)
+        contacts.append((left, zero + 1, zero, False, None))
+        contacts.append((right, zero - 1, zero, False, None))
+        contacts.append((top, zero, zero + 1, False, None))
+
+        # the paddle moves as well, so sweep relative to it
+        relative = move - np.stack([paddle_move, zero], axis=1)
+        time, normal = sweep(self.ball_pos, relative, BALL_SIZE, BALL_SIZE,
+                             (paddle_x, self.paddle_top, paddle_x + self.paddle_width, self.paddle_top + PADDLE_HEIGHT))
+        contacts.append((time, normal[:, 0], normal[:, 1], True, None))
+
+        # every block cell the swept ball covers
+        low_x = np.minimum(x, x + move[:, 0]) - 1
+        low_y = np.minimum(y, y + move[:, 1]) - 1
+        width = np.abs(move[:, 0]) + BALL_SIZE + 2
+        height = np.abs(move[:, 1]) + BALL_SIZE + 2
+        first_col, last_col, first_row, last_row = self.cell_span(low_x, low_y, width, height)
+        for row_offset in range(int((last_row - first_row)[moving].max()) + 1):
+            for col_offset in range(int((last_col - first_col)[moving].max()) + 1):
+                row = first_row + row_offset
+                col = first_col + col_offset
+                inside = moving & (row <= last_row) & (col <= last_col) & \
+                    (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+                row = np.clip(row, 0, self.rows - 1)
+                col = np.clip(col, 0, self.cols - 1)
+                inside &= self.health[np.arange(self.games), row, col] > 0
+                if not inside.any():
+                    continue
+                block_left = self.block_left[col]
+                block_top = self.block_top[row]
+                time, normal = sweep(self.ball_pos, move, BALL_SIZE, BALL_SIZE,
+                                     (block_left, block_top, block_left + self.block_width, block_top + self.block_height))
+                time = np.where(inside, time, np.inf)
+                contacts.append((time, normal[:, 0], normal[:, 1], True, (row, col)))
+
+        times = np.stack([contact[0] for contact in contacts])
+        times = np.where((times >= 0) & (times <= 1), times, np.inf)
+        contacts = [(times[index],) + contact[1:] for index, contact in enumerate(contacts)]
+        return times.min(axis=0), contacts
+
+    def window_collision_horizontal(self, active):
+        left = active & (self.ball_x < 0)
+        self.ball_x[left] = 0
+        self.ball_pos[left, 0] = 0
+        self.ball_dir[left, 0] *= -1
+
+        right = active & (self.ball_x + BALL_SIZE > WINDOW_WIDTH)
+        self.ball_x[right] = WINDOW_WIDTH - BALL_SIZE
+        self.ball_pos[right, 0] = self.ball_x[right]
+        self.ball_dir[right, 0] *= -1
+
+    def window_collision_vertical(self, active):
+        top = active & (self.ball_y < 0)
+        self.ball_y[top] = 0
+        self.ball_pos[top, 1] = 0
+        self.ball_dir[top, 1] *= -1
+
+        fail = active & (self.ball_y + BALL_SIZE > WINDOW_HEIGHT)
+        self.ball_active[fail] = False
+        self.ball_dir[fail, 1] = -1
+        self.hearts[fail] -= 1
+
+    def cell_span(self, x, y, width, height):
+        first_col = np.floor(x / self.cell_width).astype(np.int64)
+        last_col = np.floor((x + width - 1) / self.cell_width).astype(np.int64)
+        first_row = np.floor((y - TOP_OFFSET) / self.cell_height).astype(np.int64)
+        last_row = np.floor((y + height - 1 - TOP_OFFSET) / self.cell_height).astype(np.int64)
+        return first_col, last_col, first_row, last_row
+
+    def overlapping_cells(self, games, x, y, width, height):
+        # the up to four blocks a rect smaller than a cell can touch, in BLOCK_MAP order
+        first_col, last_col, first_row, last_row = self.cell_span(x, y, width, height)
+        cells = []
+        for row_offset, col_offset in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            row = first_row + row_offset
+            col = first_col + col_offset
+            inside = (row <= last_row) & (col <= last_col) & (row >= 0) & (row < self.rows) & (col >= 0) & (col < self.cols)
+            row = np.clip(row, 0, self.rows - 1)
+            col = np.clip(col, 0, self.cols - 1)
+            left = self.block_left[col]
+            top = self.block_top[row]
+            hit = inside & (self.health[games, row, col] > 0) & \
+                (x < left + self.block_width) & (x + width > left) & \
+                (y < top + self.block_height) & (y + height > top)
+            cells.append((hit, row, col, left, top))
+        return cells
+
+    def damage_blocks(self, games, rows, cols):
+        np.subtract.at(self.health, (games, rows, cols), 1)
+
+        # a block hit several times in one frame is only destroyed once
+        block = (games * self.rows + rows) * self.cols + cols
+        first = np.sort(np.unique(block, return_index=True)[1])
+        games, rows, cols = games[first], rows[first], cols[first]
+        destroyed = self.health[games, rows, cols] == 0
+        games, rows, cols = games[destroyed], rows[destroyed], cols[destroyed]
+
+        # same odds as Block.get_damage
+        drop = self.rng.integers(0, 11, len(games)) < 9
+        center_x = self.block_left[cols] + self.block_width // 2
+        center_y = self.block_top[rows] + self.block_height // 2
+        self.create_upgrades(games[drop], center_x[drop], center_y[drop])
+
+    def create_upgrades(self, games, center_x, center_y):
+        upgrade_type = self.rng.integers(0, len(UPGRADES), len(games))
+        pending = np.arange(len(games))
+
+        # one upgrade per game at a time so each finds its own free slot
+        while len(pending):
+            first = np.unique(games[pending], return_index=True)[1]
+            batch = pending[first]
+            pending = np.delete(pending, first)
+
+            game = games[batch]
+            slot = np.argmin(self.upgrade_alive[game], axis=1)
+            free = ~self.upgrade_alive[game, slot]
+            batch, game, slot = batch[free], game[free], slot[free]
+            self.upgrade_alive[game, slot] = True
+            self.upgrade_type[game, slot] = upgrade_type[batch]
+            self.upgrade_x[game, slot] = center_x[batch] - UPGRADE_SIZE // 2
+            self.upgrade_y[game, slot] = center_y[batch]
+            self.upgrade_pos[game, slot] = center_y[batch]
+
+    def update_upgrades(self, live):
+        moving = self.upgrade_alive & live[:, None]
+        self.upgrade_pos[moving] += UPGRADE_SPEED * self.dt
+        self.upgrade_y[moving] = np.rint(self.upgrade_pos[moving])
+        self.upgrade_alive &= ~(moving & (self.upgrade_y > WINDOW_HEIGHT + 100))
+
+    def upgrade_collision(self, live):
+        caught = self.upgrade_alive & live[:, None] & \
+            (self.upgrade_x < (self.paddle_x + self.paddle_width)[:, None]) & \
+            (self.upgrade_x + UPGRADE_SIZE > self.paddle_x[:, None]) & \
+            (self.upgrade_y < self.paddle_top + PADDLE_HEIGHT) & \
+            (self.upgrade_y + UPGRADE_SIZE > self.paddle_top)
+        if not caught.any():
+            return
+        self.upgrade_alive &= ~caught
+
+        count = [(caught & (self.upgrade_type == index)).sum(axis=1) for index in range(len(UPGRADES))]
+        count = dict(zip(UPGRADES, count))
+        self.paddle_speed += 50 * count['speed']
+        self.hearts += count['heart']
+        self.laser_amount += count['laser']
+        # each game keeps a single ball, so a caught multi-ball upgrade does nothing here
+
+        # every size upgrade grows the paddle by 10% around its center
+        for _ in range(count['size'].max()):
+            grow = count['size'] > 0
+            count['size'] -= grow
+            center = self.paddle_x[grow] + self.paddle_width[grow] // 2
+            self.paddle_width[grow] = (self.paddle_width[grow] * 1.1).astype(np.int64)
+            self.paddle_x[grow] = center - self.paddle_width[grow] // 2
+            self.paddle_pos[grow] = self.paddle_x[grow]
+
+    def fire(self, shooting):
+        if not shooting.any():
+            return
+        self.can_shoot[shooting] = False
+        self.shoot_time[shooting] = self.time[shooting]
+
+        # one projectile above every laser, same spacing as Player.update_lasers
+        for index in range(self.laser_count[shooting].max()):
+            games = np.flatnonzero(shooting & (self.laser_count > index))
+            divider = self.laser_width[games] / (self.laser_count[games] + 1)
+            center = rect_round(self.laser_x[games] + divider * (index + 1))
+
+            slot = np.argmin(self.projectile_alive[games], axis=1)
+            free = ~self.projectile_alive[games, slot]
+            games, slot, center = games[free], slot[free], center[free]
+            self.projectile_alive[games, slot] = True
+            self.projectile_x[games, slot] = center - PROJECTILE_SIZE[0] // 2
+            self.projectile_y[games, slot] = self.paddle_top - LASER_SIZE[1] - 30 - PROJECTILE_SIZE[1]
+            self.projectile_pos[games, slot] = self.projectile_y[games, slot]
+            self.projectile_serial[games, slot] = self.next_serial + np.arange(len(games))
+            self.next_serial += len(games)
+
+    def update_projectiles(self, live):
+        moving = self.projectile_alive & live[:, None]
+        self.projectile_pos[moving] -= PROJECTILE_SPEED * self.dt
+        self.projectile_y[moving] = np.rint(self.projectile_pos[moving])
+        self.projectile_alive &= ~(moving & (self.projectile_y + PROJECTILE_SIZE[1] <= -100))
+
+    def projectile_block_collision(self, live):
+        flying = self.projectile_alive & live[:, None]
+        if not flying.any():
+            return
+        game, slot = np.nonzero(flying)
+        cells = self.overlapping_cells(game, self.projectile_x[game, slot], self.projectile_y[game, slot], *PROJECTILE_SIZE)
+
+        # every projectile and block pair that overlaps
+        games = np.concatenate([game[hit] for hit, row, col, left, top in cells])
+        slots = np.concatenate([slot[hit] for hit, row, col, left, top in cells])
+        rows = np.concatenate([row[hit] for hit, row, col, left, top in cells])
+        cols = np.concatenate([col[hit] for hit, row, col, left, top in cells])
+        if not len(games):
+            return
+
+        # one block per projectile, same choice as BlockGrid.first_above:
+        # the lowest one, then the one it covers more, then the left one
+        x = self.projectile_x[games, slots]
+        overlap = np.minimum(x + PROJECTILE_SIZE[0], self.block_left[cols] + self.block_width) - \
+            np.maximum(x, self.block_left[cols])
+        projectile = games * self.projectile_alive.shape[1] + slots
+        order = np.lexsort((cols, -overlap, -rows, projectile))
+        first = np.unique(projectile[order], return_index=True)[1]
+        games, slots, rows, cols = (values[order][first] for values in (games, slots, rows, cols))
+
+        # projectiles resolve in the order they were fired, a block stops
+        # counting hits once earlier projectiles have destroyed it
+        block = (games * self.rows + rows) * self.cols + cols
+        order = np.lexsort((self.projectile_serial[games, slots], block))
+        games, slots, rows, cols, block = games[order], slots[order], rows[order], cols[order], block[order]
+        first = np.r_[True, block[1:] != block[:-1]]
+        rank = np.arange(len(block)) - np.maximum.accumulate(np.where(first, np.arange(len(block)), 0))
+        hit = rank < self.health[games, rows, cols]
+        games, slots, rows, cols = games[hit], slots[hit], rows[hit], cols[hit]
+
+        self.projectile_alive[games, slots] = False
+        np.add.at(self.score, games, 100)
+        np.add.at(self.projectile_kills, games, 1)
+
+        self.damage_blocks(games, rows, cols)
@@ -0,0 +1,37 @@
+import time
+from contextlib import contextmanager
+from settings import *
+
+
+# wall time spent in each startup stage, up to the first frame on screen
+class StartupProfiler:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.first_frame = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + time.perf_counter() - start
+
+    # only the first call counts
+    def frame_shown(self):
+        if self.first_frame is not None:
+            return
+        self.first_frame = time.perf_counter() - self.start
+        if STARTUP_REPORT:
+            self.print_report()
+
+    def report(self):
+        report = {name: seconds * 1000 for name, seconds in self.stages.items()}
+        if self.first_frame is not None:
+            report['first frame'] = self.first_frame * 1000
+        return report
+
+    def print_report(self):
+        for name, ms in self.report().items():
+            print(f"{name:>12}: {ms:.1f} ms")
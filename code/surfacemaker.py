@@ -1,35 +1,91 @@
 import pygame
 from settings import *
 from os import walk
+from collections import OrderedDict
+from assets import assets
 
 
 class SurfaceMaker:
-    def __init__(self):
-        # import all the graphics
-        for index, info in enumerate(walk('../graphics/theme1/blocks')):
+    def __init__(self, cache_size=SURFACE_CACHE_SIZE):
+        self.theme = 'theme1'
+
+        # finished surfaces shared by every block of the same theme, color and size
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
+        # decoded graphics for every theme that has been used so far
+        self.themes = {}
+        self.assets = self.load_theme(self.theme)
+
+    # file names of every block graphic of a theme, by color and part
+    @staticmethod
+    def theme_files(theme):
+        for index, info in enumerate(walk(assets.path('graphics', theme, 'blocks'))):
             if index == 0:
-                self.assets = {color: {} for color in info[1]}
+                files = {color: {} for color in info[1]}
             else:
                 for image_name in info[2]:
-                    color_type = list(self.assets.keys())[index - 1]
-                    full_path = '../graphics/theme1/blocks' + f'/{color_type}/' + image_name
-                    surf = pygame.image.load(full_path).convert_alpha()
-                    self.assets[color_type][image_name.split('.')[0]] = surf
+                    color_type = list(files.keys())[index - 1]
+                    files[color_type][image_name.split('.')[0]] = f'graphics/{theme}/blocks/{color_type}/{image_name}'
+        return files
+
+    @staticmethod
+    def theme_names(theme):
+        return [name for parts in SurfaceMaker.theme_files(theme).values() for name in parts.values()]
+
+    def load_theme(self, theme):
+        if theme in self.themes:
+            return self.themes[theme]
+
+        # decode every file of the theme in parallel, then convert them here
+        files = self.theme_files(theme)
+        assets.prefetch([name for parts in files.values() for name in parts.values()])
+        graphics = {}
+        for color_type, parts in files.items():
+            graphics[color_type] = {part: assets.image(name) for part, name in parts.items()}
+
+        self.themes[theme] = graphics
+        return graphics
 
     def change_surf(self, theme):
 
-        #change all graphics
-        for index, info in enumerate(walk('../graphics/' + f'{theme}/blocks')):
-            if index == 0:
-                self.assets = {color: {} for color in info[1]}
-            else:
-                for image_name in info[2]:
-                    color_type = list(self.assets.keys())[index - 1]
-                    full_path = '../graphics/' + f'{theme}/blocks' + f'/{color_type}/' + image_name
-                    surf = pygame.image.load(full_path).convert_alpha()
-                    self.assets[color_type][image_name.split('.')[0]] = surf
+        # point at the already decoded graphics of the theme
+        self.assets = self.load_theme(theme)
+        self.theme = theme
 
     def get_surf(self, block_type, size):
+        size = (int(size[0]), int(size[1]))
+        key = (self.theme, block_type, size)
+
+        # reuse the surface if it was already built
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return self.cache[key]
+
+        self.cache_misses += 1
+        image = self.build_surf(block_type, size)
+        self.cache[key] = image
+
+        # drop the least recently used surface
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+            self.cache_evictions += 1
+
+        return image
+
+    def cache_info(self):
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'evictions': self.cache_evictions,
+            'size': len(self.cache),
+        }
+
+    def build_surf(self, block_type, size):
 
         # create one surface with the graphics with any size
         image = pygame.Surface(size)
@@ -0,0 +1,105 @@
+import pygame
+
+
+class TextCache:
+    def __init__(self):
+        # last surface handed out for every text slot
+        self.labels = {}
+
+        # pre-rendered 0-9 strips per font and color, and whether a prefix joins them cleanly
+        self.strips = {}
+        self.prefixes = {}
+
+        self.hits = 0
+        self.renders = 0
+        self.composes = 0
+
+    # text that is rendered again only when it changes
+    def label(self, slot, font, text, color):
+        key = (font, text, color)
+        cached = self.labels.get(slot)
+        if cached and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+
+        surf = font.render(text, True, color)
+        self.renders += 1
+        self.labels[slot] = (key, surf)
+        return surf
+
+    # a font whose glyphs kern or reach past their advance cannot be copied from a strip, those get None
+    def strip(self, font, color):
+        if (font, color) not in self.strips:
+            digits = '0123456789'
+            surf = font.render(digits, True, color)
+            self.renders += 1
+
+            # where every digit sits inside the strip
+            areas = {}
+            for index, digit in enumerate(digits):
+                x = font.size(digits[:index])[0]
+                width = font.size(digits[:index + 1])[0] - x
+                areas[digit] = pygame.Rect(x, 0, width, surf.get_height())
+
+            # every pair of digits has to come out exactly as the font draws it
+            pairs = [a + b for a in digits for b in digits]
+            empty = pygame.Surface((0, surf.get_height()), pygame.SRCALPHA)
+            exact = all(self.same(self.compose(empty, surf, areas, pair), font.render(pair, True, color)) for pair in pairs)
+            self.renders += len(pairs)
+            self.strips[(font, color)] = (surf, areas) if exact else None
+        return self.strips[(font, color)]
+
+    # the same for the step from the prefix to the first digit, checked once per prefix
+    def joins(self, font, prefix, color, prefix_surf, strip, areas):
+        key = (font, prefix, color)
+        if key not in self.prefixes:
+            self.prefixes[key] = all(self.same(self.compose(prefix_surf, strip, areas, digit),
+                                               font.render(prefix + digit, True, color)) for digit in '0123456789')
+            self.renders += 10
+        return self.prefixes[key]
+
+    @staticmethod
+    def same(a, b):
+        return a.get_size() == b.get_size() and pygame.image.tobytes(a, 'RGBA') == pygame.image.tobytes(b, 'RGBA')
+
+    @staticmethod
+    def compose(prefix_surf, strip, areas, digits):
+        width = prefix_surf.get_width() + sum(areas[digit].width for digit in digits)
+        height = max(prefix_surf.get_height(), strip.get_height())
+
+        # copy the pixels as they are, the checks above make sure glyphs never overlap
+        surf = pygame.Surface((width, height), pygame.SRCALPHA)
+        surf.blit(prefix_surf, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        x = prefix_surf.get_width()
+        for digit in digits:
+            surf.blit(strip, (x, 0), areas[digit], special_flags=pygame.BLEND_RGBA_MAX)
+            x += areas[digit].width
+        return surf
+
+    # a prefix followed by a counter, the digits are copied from the strip instead of rendered
+    def number(self, slot, font, prefix, value, color):
+        key = (font, prefix, value, color)
+        cached = self.labels.get(slot)
+        if cached and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+
+        digits = str(value)
+        strip = self.strip(font, color) if digits.isdigit() else None
+        if strip is None:
+            return self.label(slot, font, prefix + digits, color)
+
+        prefix_surf = self.label((slot, 'prefix'), font, prefix, color)
+        strip, areas = strip
+        width = prefix_surf.get_width() + sum(areas[digit].width for digit in digits)
+        # rendered as a whole when the pieces would not line up with the font's own layout
+        if not self.joins(font, prefix, color, prefix_surf, strip, areas) or width != font.size(prefix + digits)[0]:
+            return self.label(slot, font, prefix + digits, color)
+
+        surf = self.compose(prefix_surf, strip, areas, digits)
+        self.composes += 1
+        self.labels[slot] = (key, surf)
+        return surf
+
+    def cache_info(self):
+        return {'hits': self.hits, 'renders': self.renders, 'composes': self.composes}